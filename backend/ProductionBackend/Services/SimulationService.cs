@@ -2,6 +2,7 @@ using Microsoft.Extensions.Logging;
 using ProductionBackend.DTOs;
 using ProductionBackend.Models;
 using System.Collections.Generic;
+using System.IO;
 using System.Linq;
 using System.Net.Http;
 using System.Net.Http.Json;
@@ -15,11 +16,22 @@ namespace ProductionBackend.Services
 {
     public class SimulationDataRow : Dictionary<string, JsonElement> { }
 
+    // One scored row from the ML service's /simulate-stream endpoint (NDJSON, one object per line).
+    public class SimulationEvent
+    {
+        public string? Timestamp { get; set; }
+        public string Prediction { get; set; } = "Error";
+        public double Confidence { get; set; }
+        public string? Actual { get; set; }
+        public Dictionary<string, JsonElement> Data { get; set; } = new();
+    }
+
     public class SimulationService
     {
         private readonly IHttpClientFactory _httpClientFactory;
         private readonly ILogger<SimulationService> _logger;
         private readonly JsonSerializerOptions _jsonOptions = new() { PropertyNameCaseInsensitive = true };
+        private const double SimulationSpeed = 1.0; // replay in real time: one row per second of data
 
         public SimulationService(IHttpClientFactory httpClientFactory, ILogger<SimulationService> logger)
         {
@@ -35,36 +47,15 @@ namespace ProductionBackend.Services
                 simulationPeriod.StartDate, simulationPeriod.EndDate);
 
             var httpClient = _httpClientFactory.CreateClient("MLServiceClient");
-            var simulationData = await GetSimulationDataAsync(httpClient, simulationPeriod);
-
-            if (simulationData == null || !simulationData.Any())
-            {
-                _logger.LogWarning("No data returned from ML service for the simulation period.");
-                yield break;
-            }
 
             // --- START OF THE CHANGE ---
             // Initialize a counter for the SampleId
             int sampleCounter = 1;
             // --- END OF THE CHANGE ---
 
-            foreach (var row in simulationData)
+            // The ML service reads, scores and paces the rows itself; each line of the response is one scored row.
+            await foreach (var simulationEvent in GetSimulationEventsAsync(httpClient, simulationPeriod, cancellationToken))
             {
-                cancellationToken.ThrowIfCancellationRequested();
-                await Task.Delay(1000, cancellationToken); // 1-second delay
-
-                var predictionPayload = new Dictionary<string, JsonElement>(row);
-                predictionPayload.Remove("synthetic_timestamp");
-                predictionPayload.Remove("Response");
-                
-                var predictionResponse = await GetPredictionAsync(httpClient, predictionPayload);
-
-                if (predictionResponse == null)
-                {
-                    _logger.LogWarning("ML service failed to predict for a row, using fallback.");
-                    predictionResponse = new PredictionResponse { Prediction = "Error", Confidence = 0 };
-                }
-
                 var logEntry = new PredictionLogEntry
                 {
                     Timestamp = DateTime.UtcNow,
@@ -72,9 +63,9 @@ namespace ProductionBackend.Services
                     // Use the counter for the SampleId and then increment it
                     SampleId = sampleCounter.ToString(),
                     // --- END OF THE CHANGE ---
-                    Prediction = predictionResponse.Prediction,
-                    Confidence = predictionResponse.Confidence,
-                    SensorData = row.ToDictionary(kvp => kvp.Key, kvp => (object)kvp.Value)
+                    Prediction = simulationEvent.Prediction,
+                    Confidence = simulationEvent.Confidence,
+                    SensorData = simulationEvent.Data.ToDictionary(kvp => kvp.Key, kvp => (object)kvp.Value)
                 };
                 
                 sampleCounter++; // Increment for the next loop
@@ -82,47 +73,72 @@ namespace ProductionBackend.Services
                 yield return logEntry;
             }
 
+            if (sampleCounter == 1)
+            {
+                _logger.LogWarning("No data returned from ML service for the simulation period.");
+            }
+
             _logger.LogInformation("=== Simulation Data Stream Completed ===");
         }
 
-        private async Task<List<SimulationDataRow>?> GetSimulationDataAsync(HttpClient client, PeriodDto period)
+        private async IAsyncEnumerable<SimulationEvent> GetSimulationEventsAsync(
+            HttpClient client,
+            PeriodDto period,
+            [EnumeratorCancellation] CancellationToken cancellationToken = default)
         {
-            try
+            using var response = await OpenSimulationStreamAsync(client, period, cancellationToken);
+            if (response == null)
             {
-                var response = await client.PostAsJsonAsync("get-data-for-range", new
+                yield break;
+            }
+
+            using var stream = await response.Content.ReadAsStreamAsync(cancellationToken);
+            using var reader = new StreamReader(stream);
+            string? line;
+            while ((line = await reader.ReadLineAsync(cancellationToken)) != null)
+            {
+                if (string.IsNullOrWhiteSpace(line))
                 {
-                    startDate = period.StartDate.ToString("o"),
-                    endDate = period.EndDate.ToString("o")
-                });
-                if (!response.IsSuccessStatusCode)
+                    continue;
+                }
+                var simulationEvent = JsonSerializer.Deserialize<SimulationEvent>(line, _jsonOptions);
+                if (simulationEvent != null)
                 {
-                    _logger.LogError("Failed to get simulation data. Status: {status}, Body: {body}", response.StatusCode, await response.Content.ReadAsStringAsync());
-                    return null;
+                    yield return simulationEvent;
                 }
-                return await response.Content.ReadFromJsonAsync<List<SimulationDataRow>>(_jsonOptions);
-            }
-            catch (Exception ex)
-            {
-                _logger.LogError(ex, "Exception while fetching simulation data.");
-                return null;
             }
         }
 
-        private async Task<PredictionResponse?> GetPredictionAsync(HttpClient client, Dictionary<string, JsonElement> data)
+        private async Task<HttpResponseMessage?> OpenSimulationStreamAsync(HttpClient client, PeriodDto period, CancellationToken cancellationToken)
         {
             try
             {
-                var response = await client.PostAsJsonAsync("predict", data);
+                var request = new HttpRequestMessage(HttpMethod.Post, "simulate-stream")
+                {
+                    Content = JsonContent.Create(new
+                    {
+                        startDate = period.StartDate.ToString("o"),
+                        endDate = period.EndDate.ToString("o"),
+                        speed = SimulationSpeed
+                    })
+                };
+                // ResponseHeadersRead: hand rows over as they arrive instead of buffering the whole replay.
+                var response = await client.SendAsync(request, HttpCompletionOption.ResponseHeadersRead, cancellationToken);
                 if (!response.IsSuccessStatusCode)
                 {
-                    _logger.LogWarning("Prediction request failed with status code: {statusCode}", response.StatusCode);
+                    _logger.LogError("Failed to start the simulation stream. Status: {status}, Body: {body}", response.StatusCode, await response.Content.ReadAsStringAsync(cancellationToken));
+                    response.Dispose();
                     return null;
                 }
-                return await response.Content.ReadFromJsonAsync<PredictionResponse>(_jsonOptions);
+                return response;
+            }
+            catch (OperationCanceledException)
+            {
+                throw;
             }
             catch (Exception ex)
             {
-                _logger.LogError(ex, "Prediction failed due to an exception.");
+                _logger.LogError(ex, "Exception while starting the simulation stream.");
                 return null;
             }
         }
@@ -0,0 +1,111 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/column_stats.py
+# Per-column statistics gathered while a CSV is ingested: dtype, value
+# and null counts, min/max and variance, accumulated batch by batch (variance
+# via Chan's parallel update, so one pass suffices). They are persisted
+# next to the Parquet dataset as <name>.stats.json, stamped with its
+# content hash, and let training skip columns that carry no information
+# before any data is decoded.
+# ===================================================================
+
+import json
+import os
+from typing import List, Optional
+
+import numpy as np
+import pyarrow as pa
+
+from .dataset_index import load_index
+
+STATS_VERSION = 2  # 2: exact count / null_count per column
+
+
+def stats_path_for(parquet_path: str) -> str:
+    return os.path.splitext(parquet_path)[0] + ".stats.json"
+
+
+def _is_numeric(dtype: pa.DataType) -> bool:
+    return pa.types.is_integer(dtype) or pa.types.is_floating(dtype)
+
+
+class ColumnStatsAccumulator:
+    """Streaming per-column stats. Numeric columns are reduced together, one vectorized pass per batch."""
+
+    def __init__(self, schema: pa.Schema):
+        self.schema = schema
+        self.numeric = [name for name, dtype in zip(schema.names, schema.types) if _is_numeric(dtype)]
+        self.rows = 0
+        self.null_counts = np.zeros(len(schema), dtype=np.int64)
+        width = len(self.numeric)
+        self.count = np.zeros(width, dtype=np.int64)
+        self.mean, self.m2 = np.zeros(width), np.zeros(width)
+        self.min, self.max = np.full(width, np.inf), np.full(width, -np.inf)
+
+    def update(self, batch: pa.RecordBatch):
+        self.rows += batch.num_rows
+        self.null_counts += [column.null_count for column in batch.columns]
+        if not self.numeric or batch.num_rows == 0:
+            return
+        values = np.column_stack([batch.column(name).to_numpy(zero_copy_only=False).astype(np.float64, copy=False) for name in self.numeric])
+        present = ~np.isnan(values)  # nulls arrive as NaN; NaN cells in the CSV count as missing too
+        n = present.sum(axis=0)
+        filled = np.where(present, values, 0.0)
+        batch_mean = filled.sum(axis=0) / np.maximum(n, 1)
+        batch_m2 = (np.where(present, values - batch_mean, 0.0) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean = np.where(total > 0, self.mean + delta * n / total, 0.0)
+            self.m2 = np.where(total > 0, self.m2 + batch_m2 + delta ** 2 * self.count * n / total, 0.0)
+        self.count = total
+        self.min = np.minimum(self.min, np.where(present, values, np.inf).min(axis=0))
+        self.max = np.maximum(self.max, np.where(present, values, -np.inf).max(axis=0))
+
+    def result(self) -> dict:
+        # Decisions use the exact counts; null_fraction is rounded for display
+        rows = max(self.rows, 1)
+        columns = {name: {"dtype": str(dtype), "count": self.rows - int(nulls), "null_count": int(nulls), "null_fraction": round(int(nulls) / rows, 6)}
+                   for name, dtype, nulls in zip(self.schema.names, self.schema.types, self.null_counts)}
+        for j, name in enumerate(self.numeric):
+            count = int(self.count[j])
+            columns[name].update(count=count, null_count=self.rows - count, null_fraction=round(1 - count / rows, 6), min=float(self.min[j]) if count else None,
+                                 max=float(self.max[j]) if count else None, variance=float(self.m2[j] / count) if count else None)
+        return {"version": STATS_VERSION, "num_rows": self.rows, "columns": columns}
+
+
+def write_column_stats(stats: dict, content_hash: str, stats_path: str):
+    with open(stats_path, "w") as f:
+        json.dump(dict(stats, content_hash=content_hash), f)
+
+
+def load_column_stats(parquet_path: str) -> Optional[dict]:
+    """The stats of the current dataset version, or None if they are missing or belong to another upload."""
+    index = load_index(parquet_path)
+    try:
+        with open(stats_path_for(parquet_path), "r") as f:
+            stats = json.load(f)
+    except FileNotFoundError:
+        return None
+    if index is None or stats.get("version") != STATS_VERSION or stats.get("content_hash") != index.get("content_hash"):
+        return None
+    return stats
+
+
+def uninformative_columns(columns: List[str], stats: Optional[dict]) -> dict:
+    """
+    {column: reason} for the columns training can skip: "empty" (no values at all) or "constant" (a single
+    value in every row). A single-valued column with gaps is kept, since with missing values passed to
+    XGBoost as missing, whether a station measured a part at all can be predictive.
+    """
+    if stats is None:
+        return {}
+    skipped = {}
+    for name in columns:
+        entry = stats["columns"].get(name)
+        if entry is None or "variance" not in entry:
+            continue
+        if entry["count"] == 0:
+            skipped[name] = "empty"
+        elif entry["null_count"] == 0 and entry["min"] == entry["max"]:
+            skipped[name] = "constant"
+    return skipped
@@ -0,0 +1,256 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/dataset_index.py
+# Sidecar index for the processed Parquet dataset. Ingestion writes
+# fixed-size row groups in synthetic_timestamp order and records each
+# group's timestamp range here, so range reads only open the row groups
+# that overlap the requested period. It also keeps the timestamps as
+# runs of one-per-second "segments", so range counts and the dataset
+# bounds are answered with arithmetic instead of file I/O.
+# ===================================================================
+
+import bisect
+import hashlib
+import json
+import os
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+INDEX_VERSION = 2
+TIMESTAMP_STEP_NS = 1_000_000_000  # ingestion assigns one synthetic timestamp per second
+MAX_ROW_GROUP_ROWS = 16_384  # small groups keep short range reads cheap to decode
+TARGET_ROW_GROUP_BYTES = 16 << 20  # keeps the write buffer bounded for very wide datasets
+MIN_ROW_GROUP_ROWS = 1_024
+STREAM_BATCH_ROWS = 10_000
+
+_index_cache = {}
+
+
+def index_path_for(parquet_path: str) -> str:
+    return os.path.splitext(parquet_path)[0] + ".index.json"
+
+
+def to_naive_timestamp(value) -> pd.Timestamp:
+    """Parses a request date the same way everywhere: timezone info is dropped, wall time is kept."""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+
+def row_group_size_for(batch: pa.RecordBatch) -> int:
+    """Picks a fixed row-group size for the whole file from the width of the first batch."""
+    bytes_per_row = max(1, batch.nbytes // max(1, batch.num_rows))
+    return max(MIN_ROW_GROUP_ROWS, min(MAX_ROW_GROUP_ROWS, TARGET_ROW_GROUP_BYTES // bytes_per_row))
+
+
+class RowGroupWriter:
+    """
+    Wraps a ParquetWriter so every row group (except the last) holds exactly `row_group_size`
+    rows, and records the synthetic_timestamp range of each group as it is flushed.
+    """
+
+    def __init__(self, path: str, schema: pa.Schema, row_group_size: int):
+        # Dictionary-encode only string columns: sensor values and ids are high-cardinality, so building a
+        # dictionary for them costs more encode time than anything else and then falls back to plain anyway.
+        dictionary_columns = [field.name for field in schema if pa.types.is_string(field.type) or pa.types.is_large_string(field.type)]
+        self.writer = pq.ParquetWriter(path, schema, write_statistics=True, use_dictionary=dictionary_columns)
+        self.row_group_size = row_group_size
+        self.pending: List[pa.RecordBatch] = []
+        self.pending_rows = 0
+        self.row_groups: List[dict] = []
+        self.segments: List[dict] = []
+        self.num_rows = 0
+
+    def write_batch(self, batch: pa.RecordBatch):
+        self.pending.append(batch); self.pending_rows += batch.num_rows
+        if self.pending_rows >= self.row_group_size:
+            table = pa.Table.from_batches(self.pending)
+            full = (table.num_rows // self.row_group_size) * self.row_group_size
+            for offset in range(0, full, self.row_group_size):
+                self._flush(table.slice(offset, self.row_group_size))
+            rest = table.slice(full)
+            self.pending, self.pending_rows = rest.to_batches(), rest.num_rows
+
+    def _flush(self, table: pa.Table):
+        self.writer.write_table(table, row_group_size=table.num_rows)
+        ts = table.column("synthetic_timestamp").cast(pa.int64()).to_numpy()
+        self.row_groups.append({"first_row": self.num_rows, "num_rows": table.num_rows, "min": int(ts.min()), "max": int(ts.max())})
+        self._extend_segments(ts)
+        self.num_rows += table.num_rows
+
+    def _extend_segments(self, ts: np.ndarray):
+        breaks = np.flatnonzero(np.diff(ts) != TIMESTAMP_STEP_NS) + 1
+        for run_start, run_end in zip(np.r_[0, breaks], np.r_[breaks, len(ts)]):
+            first, count = int(ts[run_start]), int(run_end - run_start)
+            last = self.segments[-1] if self.segments else None
+            if last and last["start"] + last["num_rows"] * TIMESTAMP_STEP_NS == first:
+                last["num_rows"] += count
+            else:
+                self.segments.append({"start": first, "first_row": self.num_rows + int(run_start), "num_rows": count})
+
+    def close(self):
+        if self.pending_rows:
+            self._flush(pa.Table.from_batches(self.pending))
+            self.pending, self.pending_rows = [], 0
+        self.writer.close()
+
+    def abort(self):
+        self.writer.close()
+
+    def index(self) -> dict:
+        return {"version": INDEX_VERSION, "row_group_size": self.row_group_size, "num_rows": self.num_rows, "row_groups": self.row_groups, "segments": self.segments}
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()[:32]
+
+
+def write_index(index: dict, parquet_path: str, index_path: str) -> dict:
+    """
+    Stamps the index with the size of the Parquet file it describes, so a stale index is never used,
+    and with a content hash that keys derived artifacts (see feature_cache.py). Returns the stamped index.
+    """
+    index = dict(index, parquet_size=os.path.getsize(parquet_path), content_hash=file_digest(parquet_path))
+    with open(index_path, "w") as f:
+        json.dump(index, f)
+    return index
+
+
+def load_index(parquet_path: str) -> Optional[dict]:
+    """Returns the sidecar index for `parquet_path`, or None if it is missing or stale. Cached per file version."""
+    index_path = index_path_for(parquet_path)
+    try:
+        key = (os.stat(parquet_path).st_mtime_ns, os.stat(index_path).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+    cached = _index_cache.get(parquet_path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(index_path, "r") as f:
+        index = json.load(f)
+    if index.get("version") != INDEX_VERSION or index.get("parquet_size") != os.path.getsize(parquet_path):
+        index = None
+    else:
+        index["_group_max"] = [g["max"] for g in index["row_groups"]]
+        index["_segment_start"] = [seg["start"] for seg in index["segments"]]
+        index["_metadata"] = pq.read_metadata(parquet_path)
+    _index_cache[parquet_path] = (key, index)
+    return index
+
+
+def row_groups_for_range(index: dict, start: pd.Timestamp, end: pd.Timestamp) -> List[int]:
+    """Row groups whose [min, max] overlaps [start, end]. Groups are sorted, so this is a bisect + short scan."""
+    start_ns, end_ns = start.value, end.value
+    groups, first = index["row_groups"], bisect.bisect_left(index["_group_max"], start_ns)
+    selected = []
+    for i in range(first, len(groups)):
+        if groups[i]["min"] > end_ns: break
+        selected.append(i)
+    return selected
+
+
+def index_bounds(index: dict):
+    """First and last synthetic_timestamp in the dataset."""
+    first, last = index["segments"][0], index["segments"][-1]
+    return pd.Timestamp(first["start"]), pd.Timestamp(last["start"] + (last["num_rows"] - 1) * TIMESTAMP_STEP_NS)
+
+
+def count_range(index: dict, start, end) -> int:
+    """Number of rows with start <= synthetic_timestamp <= end, from the segment index alone."""
+    start_ns, end_ns = to_naive_timestamp(start).value, to_naive_timestamp(end).value
+    segments, total = index["segments"], 0
+    i = max(0, bisect.bisect_right(index["_segment_start"], start_ns) - 1)
+    while i < len(segments) and segments[i]["start"] <= end_ns:
+        seg = segments[i]
+        lo = max(0, -(-(start_ns - seg["start"]) // TIMESTAMP_STEP_NS))
+        hi = min(seg["num_rows"] - 1, (end_ns - seg["start"]) // TIMESTAMP_STEP_NS)
+        total += max(0, hi - lo + 1)
+        i += 1
+    return total
+
+
+def row_span(index: dict, start, end) -> slice:
+    """
+    Row offsets [lo, hi) of start <= synthetic_timestamp <= end. Timestamps increase with the row
+    number, so every range is one contiguous run of rows.
+    """
+    start_ns, end_ns = to_naive_timestamp(start).value, to_naive_timestamp(end).value
+    segments, starts = index["segments"], index["_segment_start"]
+
+    def first_row_at_or_after(ts_ns: int) -> int:
+        i = bisect.bisect_right(starts, ts_ns) - 1
+        if i >= 0:
+            seg = segments[i]
+            offset = -(-(ts_ns - seg["start"]) // TIMESTAMP_STEP_NS)
+            if offset < seg["num_rows"]:
+                return seg["first_row"] + offset
+        return segments[i + 1]["first_row"] if i + 1 < len(segments) else index["num_rows"]
+
+    lo = first_row_at_or_after(start_ns)
+    hi = first_row_at_or_after(end_ns + 1)
+    return slice(lo, max(lo, hi))
+
+
+def read_range(parquet_path: str, start, end, columns: Optional[List[str]] = None) -> pa.Table:
+    """
+    Reads the rows with start <= synthetic_timestamp <= end. Uses the sidecar index to open only
+    the overlapping row groups, falling back to a filtered scan for datasets written without one.
+    """
+    start, end = to_naive_timestamp(start), to_naive_timestamp(end)
+    index = load_index(parquet_path)
+    if index is None:
+        filters = [('synthetic_timestamp', '>=', start), ('synthetic_timestamp', '<=', end)]
+        return pq.read_table(parquet_path, columns=columns, filters=filters)
+
+    read_columns = None if columns is None else list(dict.fromkeys(columns + ["synthetic_timestamp"]))
+    parquet_file = pq.ParquetFile(parquet_path, metadata=index["_metadata"])
+    groups = row_groups_for_range(index, start, end)
+    if not groups:
+        return parquet_file.schema_arrow.empty_table().select(columns or parquet_file.schema_arrow.names)
+    table = parquet_file.read_row_groups(groups, columns=read_columns)
+    ts = table.column("synthetic_timestamp")
+    mask = pc.and_(pc.greater_equal(ts, pa.scalar(start, ts.type)), pc.less_equal(ts, pa.scalar(end, ts.type)))
+    table = table.filter(mask)
+    return table if columns is None else table.select(columns)
+
+
+def iter_range_batches(parquet_path: str, start, end, columns: Optional[List[str]] = None,
+                       batch_size: int = STREAM_BATCH_ROWS, limit: Optional[int] = None) -> Iterator[pa.RecordBatch]:
+    """
+    Streaming counterpart of read_range: yields record batches of at most `batch_size` rows,
+    in timestamp order, stopping after `limit` rows. Only one batch is materialized at a time.
+    """
+    start, end = to_naive_timestamp(start), to_naive_timestamp(end)
+    index = load_index(parquet_path)
+    # pre_buffer would fetch every selected row group up front, making memory grow with the window
+    if index is not None:
+        parquet_file = pq.ParquetFile(parquet_path, metadata=index["_metadata"], pre_buffer=False)
+        groups = row_groups_for_range(index, start, end)
+    else:
+        parquet_file = pq.ParquetFile(parquet_path, pre_buffer=False)
+        groups = list(range(parquet_file.num_row_groups))
+    if not groups or (limit is not None and limit <= 0):
+        return
+    read_columns = None if columns is None else list(dict.fromkeys(columns + ["synthetic_timestamp"]))
+    remaining = limit
+    for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=groups, columns=read_columns):
+        ts = batch.column("synthetic_timestamp")
+        batch = batch.filter(pc.and_(pc.greater_equal(ts, pa.scalar(start, ts.type)), pc.less_equal(ts, pa.scalar(end, ts.type))))
+        if columns is not None:
+            batch = batch.select(columns)
+        if remaining is not None:
+            batch = batch.slice(0, remaining); remaining -= batch.num_rows
+        if batch.num_rows:
+            yield batch
+        if remaining == 0 or (index is not None and pc.max(ts).value > end.value):
+            return
+
+
+def range_schema(parquet_path: str, columns: Optional[List[str]] = None) -> pa.Schema:
+    index = load_index(parquet_path)
+    schema = index["_metadata"].schema.to_arrow_schema() if index is not None else pq.read_schema(parquet_path)
+    return schema if columns is None else pa.schema([schema.field(name) for name in columns])
@@ -0,0 +1,179 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/drift.py
+# Drift monitoring. Training summarizes a sample of the training window
+# into per-feature decile histograms (plus a missing-value bin) and the
+# held-out score distribution, saved with the model. While the model
+# serves, a DriftMonitor adds the scored rows to histograms over the same
+# bins, so comparing them (PSI and a binned KS statistic) costs
+# O(features x bins) no matter how many rows have been seen.
+# ===================================================================
+
+import json
+import os
+import random
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from .dataset_index import count_range, iter_range_batches, load_index, read_range
+from .predictor import table_to_matrix
+
+REFERENCE_FILE = "drift_reference.json"
+REFERENCE_VERSION = 1
+REFERENCE_ROWS = 20_000  # rows of the training window summarized into the reference
+FEATURE_BINS = 10  # deciles of the reference; a further bin counts missing values
+SCORE_BINS = 50  # fixed-width bins over [0, 1]
+# Share of scored rows whose features are binned (scores are always counted): binning costs
+# O(rows x features), a good part of the scoring cost itself on wide models, and a sample suffices.
+DRIFT_SAMPLE_RATE = float(os.getenv("DRIFT_SAMPLE_RATE", "0.05"))
+PSI_ALERT = float(os.getenv("DRIFT_PSI_ALERT", "0.25"))  # the usual reading: < 0.1 stable, 0.1-0.25 moderate, > 0.25 major shift
+MIN_ALERT_ROWS = int(os.getenv("DRIFT_MIN_ROWS", "1000"))  # PSI of a few hundred rows is mostly sampling noise
+BIN_CHUNK_ROWS = 2_048
+EPSILON = 1e-4  # stands in for empty bins in PSI
+
+
+def reference_sample(parquet_path: str, cache, feature_cols: List[str], start, end, missing: float) -> np.ndarray:
+    """
+    Up to REFERENCE_ROWS rows spread evenly over [start, end], aligned to `feature_cols` with missing
+    values as `missing` (as the model sees them). Strided views of the feature cache when it fits.
+    """
+    if cache is not None and cache.columns == feature_cols and np.isnan(missing):
+        features, _ = cache.window(start, end)
+        return np.asarray(features[::max(1, -(-len(features) // REFERENCE_ROWS))])
+    index = load_index(parquet_path)
+    rows = count_range(index, start, end) if index is not None else read_range(parquet_path, start, end, columns=["Response"]).num_rows
+    step, seen, parts = max(1, -(-rows // REFERENCE_ROWS)), 0, []
+    for batch in iter_range_batches(parquet_path, start, end, columns=feature_cols):
+        parts.append(table_to_matrix(batch, feature_cols, missing)[(-seen) % step::step])
+        seen += batch.num_rows
+    return np.concatenate(parts) if parts else np.empty((0, len(feature_cols)), dtype=np.float32)
+
+
+def quantile_edges(matrix: np.ndarray, bins: int = FEATURE_BINS) -> List[List[float]]:
+    """Per column, the distinct inner quantile edges of its present values (fewer than bins - 1 for discrete columns)."""
+    quantiles = np.linspace(0, 1, bins + 1)[1:-1]
+    edges = []
+    for j in range(matrix.shape[1]):
+        column = matrix[:, j]
+        present = column[~np.isnan(column)]
+        edges.append(np.unique(np.quantile(present, quantiles).astype(np.float32)).tolist() if len(present) else [])
+    return edges
+
+
+def padded_edges(edges: List[List[float]], bins: int = FEATURE_BINS) -> np.ndarray:
+    """Edges as a (features, bins - 1) array; +inf padding leaves the unused bins empty."""
+    padded = np.full((len(edges), bins - 1), np.inf, dtype=np.float32)
+    for j, column_edges in enumerate(edges):
+        padded[j, :len(column_edges)] = column_edges
+    return padded
+
+
+def bin_counts(matrix: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """(features, bins + 1) counts of `matrix`'s values in `edges` (see padded_edges); the last bin counts NaN."""
+    features, bins = edges.shape[0], edges.shape[1] + 1
+    offsets = np.arange(features) * (bins + 1)
+    counts = np.zeros(features * (bins + 1), dtype=np.int64)
+    for i in range(0, len(matrix), BIN_CHUNK_ROWS):
+        chunk = matrix[i:i + BIN_CHUNK_ROWS]
+        # Edges below each value, one (rows x features) comparison per edge: ~4x faster than
+        # summing a (rows x features x edges) comparison over its short last axis. NaN is below none.
+        index, below = np.zeros(chunk.shape, dtype=np.uint8), np.empty(chunk.shape, dtype=bool)
+        for k in range(edges.shape[1]):
+            index += np.greater(chunk, edges[:, k], out=below)
+        index[np.isnan(chunk)] = bins
+        counts += np.bincount((index + offsets).ravel(), minlength=len(counts))
+    return counts.reshape(features, bins + 1)
+
+
+def score_counts(scores: np.ndarray) -> np.ndarray:
+    return np.bincount(np.clip((np.asarray(scores) * SCORE_BINS).astype(np.int64), 0, SCORE_BINS - 1), minlength=SCORE_BINS)
+
+
+def build_reference(sample: np.ndarray, columns: List[str], scores: np.ndarray) -> dict:
+    """The reference histograms saved with a model: features from a training-window sample, scores from the test window."""
+    edges = quantile_edges(sample)
+    return {"version": REFERENCE_VERSION, "columns": list(columns), "rows": len(sample), "edges": edges,
+            "feature_counts": bin_counts(sample, padded_edges(edges)).tolist(), "score_counts": score_counts(scores).tolist()}
+
+
+def write_reference(reference: dict, model_dir: str):
+    with open(os.path.join(model_dir, REFERENCE_FILE), "w") as f:
+        json.dump(reference, f)
+
+
+def load_reference(model_dir: str) -> Optional[dict]:
+    """The model's reference histograms, or None for models trained before drift monitoring."""
+    try:
+        with open(os.path.join(model_dir, REFERENCE_FILE), "r") as f:
+            reference = json.load(f)
+    except FileNotFoundError:
+        return None
+    return reference if reference.get("version") == REFERENCE_VERSION else None
+
+
+def _shares(counts: np.ndarray) -> np.ndarray:
+    return counts / np.maximum(counts.sum(axis=-1, keepdims=True), 1)
+
+
+def psi(reference: np.ndarray, current: np.ndarray) -> np.ndarray:
+    """Population stability index of histograms over the same bins (the last axis), e.g. one per feature."""
+    p, q = np.maximum(_shares(reference), EPSILON), np.maximum(_shares(current), EPSILON)
+    return np.sum((q - p) * np.log(q / p), axis=-1)
+
+
+def binned_ks(reference: np.ndarray, current: np.ndarray) -> np.ndarray:
+    """Largest gap between the cumulative distributions at the bin edges (a lower bound of the exact KS statistic)."""
+    return np.max(np.abs(np.cumsum(_shares(reference), axis=-1) - np.cumsum(_shares(current), axis=-1)), axis=-1)
+
+
+class DriftMonitor:
+    """
+    Streaming histograms of one loaded model's inputs and scores. observe() is vectorized per batch and
+    thread-safe; report() compares them with the training reference. Counts start when the model is loaded.
+    """
+
+    def __init__(self, reference: dict, sample_rate: float = DRIFT_SAMPLE_RATE):
+        self.columns = reference["columns"]
+        self.edges = padded_edges(reference["edges"])
+        self.reference_features = np.asarray(reference["feature_counts"], dtype=np.int64)
+        self.reference_scores = np.asarray(reference["score_counts"], dtype=np.int64)
+        self.stride = max(1, round(1 / sample_rate)) if sample_rate > 0 else None
+        self.feature_counts = np.zeros_like(self.reference_features)
+        self.score_counts = np.zeros_like(self.reference_scores)
+        self.rows_scored, self.rows_sampled, self.since = 0, 0, time.time()
+        self._lock = threading.Lock()
+
+    def observe(self, matrix: np.ndarray, scores: np.ndarray):
+        """Adds a scored batch: every score, and the features of every stride-th row from a random offset."""
+        sampled = matrix[random.randrange(self.stride)::self.stride] if self.stride is not None else matrix[:0]
+        features = bin_counts(sampled, self.edges) if len(sampled) else None
+        scores = score_counts(scores)
+        with self._lock:
+            self.score_counts += scores
+            self.rows_scored += len(matrix)
+            if features is not None:
+                self.feature_counts += features
+                self.rows_sampled += len(sampled)
+
+    def report(self, limit: Optional[int] = None) -> dict:
+        with self._lock:
+            features, scores = self.feature_counts.copy(), self.score_counts.copy()
+            rows_scored, rows_sampled = self.rows_scored, self.rows_sampled
+        drift = []
+        if rows_sampled:
+            # All features at once: a few (features x bins) array operations
+            feature_psi, feature_ks = psi(self.reference_features, features), binned_ks(self.reference_features, features)
+            reference_missing, current_missing = _shares(self.reference_features)[:, -1], _shares(features)[:, -1]
+            drift = [{"feature": self.columns[j], "psi": float(feature_psi[j]), "ks": float(feature_ks[j]),
+                      "reference_missing": float(reference_missing[j]), "current_missing": float(current_missing[j])}
+                     for j in np.argsort(-feature_psi, kind="stable")]
+        score_psi = float(psi(self.reference_scores, scores))
+        return {
+            "since": self.since, "rows_scored": rows_scored, "rows_sampled": rows_sampled, "sample_rate": 1 / self.stride if self.stride else 0.0,
+            "psi_alert": PSI_ALERT, "min_alert_rows": MIN_ALERT_ROWS,
+            "score": {"psi": score_psi, "ks": float(binned_ks(self.reference_scores, scores)), "alert": rows_scored >= MIN_ALERT_ROWS and score_psi > PSI_ALERT} if rows_scored else None,
+            "alerts": [entry["feature"] for entry in drift if entry["psi"] > PSI_ALERT] if rows_sampled >= MIN_ALERT_ROWS else [],
+            "features": drift[:limit] if limit is not None else drift,
+        }
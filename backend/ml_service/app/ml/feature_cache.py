@@ -0,0 +1,150 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/feature_cache.py
+# Decoded feature cache. After an upload the informative numeric feature
+# columns are decoded once into a float32 matrix (missing values -> NaN)
+# and a label vector, stored as .npy files under a directory named after the
+# dataset's content hash. Retraining memory-maps them, and a date window
+# becomes a zero-copy row slice located through the timestamp segments
+# of the dataset index.
+# ===================================================================
+
+import json
+import os
+import shutil
+import time
+from typing import List, Optional
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from .column_stats import load_column_stats, uninformative_columns
+from .dataset_index import load_index, row_span
+from .out_of_core import batch_labels
+from .predictor import table_to_matrix
+
+FEATURE_CACHE_DIR_NAME = "feature_cache"
+FEATURE_CACHE_BUDGET_MB = int(os.getenv("FEATURE_CACHE_BUDGET_MB", "4096"))
+FEATURES_FILE, LABELS_FILE, META_FILE = "features.npy", "labels.npy", "meta.json"
+CACHE_FORMAT = 2  # 2: missing values stored as NaN, uninformative columns left out
+BUILD_BATCH_ROWS = 16_384
+
+EXCLUDED_COLUMNS = ['Response', 'Response_mapped', 'synthetic_timestamp']
+NUMERIC_TYPES = ['int', 'float', 'double']
+
+
+def numeric_feature_columns(schema) -> List[str]:
+    """The model's feature columns: every numeric column except the label, timestamp and the leading id column."""
+    exclude_cols = EXCLUDED_COLUMNS + [schema.names[0]]
+    return [
+        field.name for field in schema
+        if field.name not in exclude_cols and any(t in str(field.type).lower() for t in NUMERIC_TYPES)
+    ]
+
+
+def training_feature_columns(parquet_path: str, schema) -> List[str]:
+    """The numeric feature columns minus those the ingest-time stats show to be empty or constant."""
+    columns = numeric_feature_columns(schema)
+    skipped = uninformative_columns(columns, load_column_stats(parquet_path))
+    return [name for name in columns if name not in skipped]
+
+
+def cache_root_for(parquet_path: str) -> str:
+    return os.path.join(os.path.dirname(parquet_path), FEATURE_CACHE_DIR_NAME)
+
+
+class FeatureCache:
+    """Memory-mapped features/labels of one dataset version. Windows are slices of the mapped arrays."""
+
+    def __init__(self, path: str, index: dict):
+        with open(os.path.join(path, META_FILE), "r") as f:
+            meta = json.load(f)
+        self.path, self.index = path, index
+        self.format = meta.get("format", 1)
+        self.columns: List[str] = meta["columns"]
+        self.features = np.load(os.path.join(path, FEATURES_FILE), mmap_mode="r")
+        self.labels = np.load(os.path.join(path, LABELS_FILE), mmap_mode="r")
+
+    def rows_for_range(self, start, end) -> slice:
+        return row_span(self.index, start, end)
+
+    def window(self, start, end):
+        """(features, labels) for start <= synthetic_timestamp <= end, as read-only views into the cache."""
+        rows = self.rows_for_range(start, end)
+        return self.features[rows], self.labels[rows]
+
+
+def load_feature_cache(parquet_path: str) -> Optional[FeatureCache]:
+    """The cache for the current version of `parquet_path`, or None if it has not been built."""
+    index = load_index(parquet_path)
+    if index is None or "content_hash" not in index:
+        return None
+    path = os.path.join(cache_root_for(parquet_path), index["content_hash"])
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        return None
+    cache = FeatureCache(path, index)
+    if cache.format != CACHE_FORMAT:
+        return None
+    os.utime(path)  # last use, for eviction
+    return cache
+
+
+def cache_size_bytes(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def evict_stale_entries(parquet_path: str, keep: Optional[str] = None, budget_bytes: int = FEATURE_CACHE_BUDGET_MB << 20):
+    """Drops every cache entry except `keep` (the current dataset), then the oldest-used ones while over budget."""
+    root = cache_root_for(parquet_path)
+    if not os.path.isdir(root):
+        return
+    entries = sorted((entry for entry in os.scandir(root) if entry.is_dir()), key=lambda entry: entry.stat().st_mtime)
+    for entry in entries:
+        if entry.name != keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    current = os.path.join(root, keep) if keep else None
+    if current and os.path.isdir(current) and cache_size_bytes(current) > budget_bytes:
+        shutil.rmtree(current, ignore_errors=True)
+
+
+def build_feature_cache(parquet_path: str, budget_bytes: int = FEATURE_CACHE_BUDGET_MB << 20) -> Optional[FeatureCache]:
+    """
+    Decodes the dataset into the cache (reusing an existing entry for identical content) and evicts
+    entries of previous uploads. Datasets whose matrix would not fit in the disk budget are not cached.
+    """
+    index = load_index(parquet_path)
+    if index is None or "content_hash" not in index:
+        return None
+    content_hash = index["content_hash"]
+    evict_stale_entries(parquet_path, keep=content_hash, budget_bytes=budget_bytes)
+    cached = load_feature_cache(parquet_path)
+    if cached is not None:
+        return cached
+
+    parquet_file = pq.ParquetFile(parquet_path, metadata=index["_metadata"], pre_buffer=False)
+    columns = training_feature_columns(parquet_path, parquet_file.schema_arrow)
+    num_rows = index["num_rows"]
+    if not columns or num_rows * (4 * len(columns) + 1) > budget_bytes:
+        print(f"⚠️ Feature cache skipped ({num_rows} rows x {len(columns)} features exceeds the {budget_bytes >> 20} MB budget).")
+        return None
+
+    path = os.path.join(cache_root_for(parquet_path), content_hash)
+    staging = path + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        features = np.lib.format.open_memmap(os.path.join(staging, FEATURES_FILE), mode="w+", dtype=np.float32, shape=(num_rows, len(columns)))
+        labels = np.lib.format.open_memmap(os.path.join(staging, LABELS_FILE), mode="w+", dtype=np.int8, shape=(num_rows,))
+        offset = 0
+        for batch in parquet_file.iter_batches(batch_size=BUILD_BATCH_ROWS, columns=columns + ["Response"]):
+            features[offset:offset + batch.num_rows] = table_to_matrix(batch, columns, np.nan)
+            labels[offset:offset + batch.num_rows] = batch_labels(batch)
+            offset += batch.num_rows
+        features.flush(); labels.flush()
+        del features, labels
+        with open(os.path.join(staging, META_FILE), "w") as f:
+            json.dump({"format": CACHE_FORMAT, "content_hash": content_hash, "columns": columns, "num_rows": num_rows, "created_at": time.time()}, f)
+        shutil.rmtree(path, ignore_errors=True)  # an entry in an older format
+        os.replace(staging, path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return FeatureCache(path, index)
@@ -0,0 +1,170 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/ingest.py
+# Streams an uploaded CSV into the processed Parquet dataset one block
+# at a time, so peak memory is bounded by the block size, not the file.
+# Parsing (multi-threaded inside Arrow), label normalization and Parquet
+# encoding run as a three-stage pipeline connected by bounded FIFO
+# queues, so the stages overlap while row order stays exact. Column
+# statistics (column_stats.py) are gathered on the way through.
+# ===================================================================
+
+import os
+import queue
+import threading
+from typing import BinaryIO, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+
+from .column_stats import ColumnStatsAccumulator, stats_path_for, write_column_stats
+from .dataset_index import RowGroupWriter, index_path_for, row_group_size_for, write_index
+
+DATASET_START = pd.Timestamp("2025-08-01 00:00:00")
+INGEST_BLOCK_SIZE = 1 << 20  # bytes of CSV per record batch; the reader buffers ~32 blocks ahead
+INGEST_PIPELINE_DEPTH = int(os.getenv("INGEST_PIPELINE_DEPTH", "4"))  # batches queued between stages; 0 runs them inline
+
+PASS_VALUES = pa.array(["pass", "1", "p"])
+FAIL_VALUES = pa.array(["fail", "0", "f"])
+
+
+def _open_reader(source: BinaryIO, column_types: dict) -> pv.CSVStreamingReader:
+    source.seek(0)
+    return pv.open_csv(
+        source,
+        read_options=pv.ReadOptions(block_size=INGEST_BLOCK_SIZE, use_threads=True),
+        convert_options=pv.ConvertOptions(column_types=column_types),
+    )
+
+
+def open_csv_stream(source: BinaryIO) -> pv.CSVStreamingReader:
+    """
+    Opens a streaming reader over a seekable CSV file. Types are inferred from the first
+    block; columns that are empty there would be inferred as `null` and reject later values,
+    so they are read as float64 (what pandas would have produced for them).
+    """
+    column_types = {"Response": pa.string()}
+    schema = _open_reader(source, column_types).schema
+    if "Response" not in schema.names:
+        raise ValueError("Dataset must have a 'Response' column.")
+    column_types.update({field.name: pa.float64() for field in schema if pa.types.is_null(field.type)})
+    return _open_reader(source, column_types)
+
+
+def normalize_batch(batch: pa.RecordBatch, start_index: int) -> pa.RecordBatch:
+    """Maps Response to 'pass'/'fail', drops rows with any other label and sets synthetic_timestamp (replacing any in the CSV)."""
+    response_idx = batch.schema.get_field_index("Response")
+    labels = pc.utf8_lower(pc.utf8_trim_whitespace(batch.column(response_idx)))
+    is_pass, is_fail = pc.is_in(labels, value_set=PASS_VALUES), pc.is_in(labels, value_set=FAIL_VALUES)
+    batch = batch.set_column(response_idx, "Response", pc.if_else(is_pass, "pass", "fail"))
+    batch = batch.filter(pc.or_(is_pass, is_fail))
+    offsets = np.arange(start_index, start_index + batch.num_rows, dtype="int64").astype("timedelta64[s]")
+    timestamps = pa.array(np.datetime64(DATASET_START, "ns") + offsets, type=pa.timestamp("ns"))
+    existing = batch.schema.get_field_index("synthetic_timestamp")
+    if existing >= 0:
+        return batch.set_column(existing, "synthetic_timestamp", timestamps)
+    return batch.append_column("synthetic_timestamp", timestamps)
+
+
+class BackgroundIterator:
+    """
+    Runs an iterator in a daemon thread and hands its items over through a bounded queue, in order.
+    Exceptions are re-raised in the consumer; close() stops the producer at the next item.
+    """
+
+    def __init__(self, iterable: Iterable, depth: int = INGEST_PIPELINE_DEPTH):
+        self._queue = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(iterable,), daemon=True)
+        self._thread.start()
+
+    def _run(self, iterable: Iterable):
+        try:
+            for item in iterable:
+                if not self._put((True, item)): return
+            self._put((False, None))
+        except BaseException as e:
+            self._put((False, e))
+
+    def _put(self, entry) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator:
+        while True:
+            has_item, item = self._queue.get()
+            if not has_item:
+                if item is not None: raise item
+                return
+            yield item
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def normalized_batches(batches: Iterable[pa.RecordBatch], stats: dict) -> Iterator[pa.RecordBatch]:
+    """The normalization stage: timestamps continue from the rows kept so far, so sequencing is exact."""
+    for batch in batches:
+        batch = normalize_batch(batch, stats["total_records"])
+        if batch.num_rows == 0: continue
+        stats["pass_count"] += pc.sum(pc.equal(batch.column("Response"), "pass")).as_py() or 0
+        stats["total_records"] += batch.num_rows
+        if stats["columns"] is None: stats["columns"] = ColumnStatsAccumulator(batch.schema)
+        stats["columns"].update(batch)
+        yield batch
+
+
+def convert_csv_to_parquet(source: BinaryIO, parquet_path: str, pipeline_depth: int = INGEST_PIPELINE_DEPTH) -> dict:
+    """
+    Converts a CSV file object into `parquet_path`, streaming block by block into fixed-size,
+    timestamp-ordered row groups plus the sidecar range index and column statistics. All files are
+    written next to their targets and swapped in only once the whole file converted cleanly.
+    Returns the stats reported by the upload endpoint.
+    """
+    reader = open_csv_stream(source)
+    column_count = len(reader.schema.names) + 1
+    stats = {"total_records": 0, "pass_count": 0, "columns": None}
+    stages = []
+    if pipeline_depth > 0:
+        stages.append(BackgroundIterator(reader, pipeline_depth))
+        stages.append(BackgroundIterator(normalized_batches(stages[0], stats), pipeline_depth))
+        batches = stages[-1]
+    else:
+        batches = normalized_batches(reader, stats)
+    tmp_path, tmp_index_path, tmp_stats_path, writer = parquet_path + ".tmp", index_path_for(parquet_path) + ".tmp", stats_path_for(parquet_path) + ".tmp", None
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = RowGroupWriter(tmp_path, batch.schema, row_group_size_for(batch))
+            writer.write_batch(batch)
+        total_records, pass_count = stats["total_records"], stats["pass_count"]
+        if total_records == 0:
+            raise ValueError("No valid rows with 'pass' or 'fail' found.")
+        writer.close()
+        index = write_index(writer.index(), tmp_path, tmp_index_path)
+        write_column_stats(stats["columns"].result(), index["content_hash"], tmp_stats_path)
+        writer = None
+        os.replace(tmp_path, parquet_path)
+        os.replace(tmp_index_path, index_path_for(parquet_path))
+        os.replace(tmp_stats_path, stats_path_for(parquet_path))
+    finally:
+        for stage in reversed(stages): stage.close()
+        if writer is not None: writer.abort()
+        for path in (tmp_path, tmp_index_path, tmp_stats_path):
+            if os.path.exists(path): os.remove(path)
+
+    return {
+        "total_records": total_records,
+        "pass_count": pass_count,
+        "column_count": column_count,
+        "date_range_start": DATASET_START,
+        "date_range_end": DATASET_START + pd.Timedelta(seconds=total_records - 1),
+    }
@@ -0,0 +1,195 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/jobs.py
+# Background training jobs. Training runs in a separate process so the
+# API process (and its event loop) stays responsive; workers report the
+# current stage and boosting round through a shared progress dict.
+# Under app/serve.py's forked workers the job table is also published to
+# files (share_state), so any worker can answer for any job, and file
+# locks keep the workers together within TRAINING_WORKERS concurrent runs.
+# ===================================================================
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import numpy as np
+
+from .telemetry import TRAINING_JOBS, record_stage_timings
+
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "1"))
+MAX_FINISHED_JOBS = 100
+PUBLISH_SECONDS = 0.5  # how often the progress of running jobs is written to the shared state directory
+SLOT_POLL_SECONDS = 1.0
+
+
+def _run_training_job(progress, kwargs: dict) -> dict:
+    from .model_trainer import train_model_on_range
+    return train_model_on_range(progress=progress, **kwargs)
+
+
+def run_search_job(progress, kwargs: dict) -> dict:
+    from .tuning import search_hyperparameters
+    return search_hyperparameters(progress=progress, **kwargs)
+
+
+@contextmanager
+def _training_slot(state_dir: str, slots: int):
+    """Holds one of `slots` lock files under `state_dir` (shared by every process serving it), waiting until one is free."""
+    import fcntl  # POSIX only, like the fork-based server that shares the state directory
+    while True:
+        for slot in range(slots):
+            with open(os.path.join(state_dir, f".slot_{slot}.lock"), "w") as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                yield
+                return
+        time.sleep(SLOT_POLL_SECONDS)
+
+
+def _run_in_slot(target: Callable, progress, kwargs: dict, state_dir: str, slots: int) -> dict:
+    with _training_slot(state_dir, slots):
+        return target(progress, kwargs)
+
+
+def _json_default(value):
+    return value.tolist() if isinstance(value, (np.generic, np.ndarray)) else str(value)
+
+
+class TrainingJobManager:
+    """
+    Owns the training process pool and the in-memory job table. The pool and the progress
+    manager are started lazily on the first job, so an idle service does not pay for them.
+    """
+
+    def __init__(self, workers: int = TRAINING_WORKERS):
+        self._workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._state_dir: Optional[str] = None
+        self._publisher: Optional[threading.Thread] = None
+        self._publish_lock = threading.Lock()  # the publisher thread and _finish write the same files
+
+    def share_state(self, state_dir: str):
+        """
+        For several processes serving one service (call before they fork): jobs are published as
+        <state_dir>/<job_id>.json, get() falls back to those files, and runs wait for one of
+        TRAINING_WORKERS slots shared by all the processes.
+        """
+        os.makedirs(state_dir, exist_ok=True)
+        self._state_dir = state_dir
+
+    def _ensure_started(self):
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            self._manager = context.Manager()
+            self._executor = ProcessPoolExecutor(max_workers=self._workers, mp_context=context)
+        if self._state_dir is not None and self._publisher is None:
+            self._publisher = threading.Thread(target=self._publish_running, name="job-publisher", daemon=True)
+            self._publisher.start()
+
+    def submit(self, kwargs: dict, on_success: Optional[Callable[[dict, dict], None]] = None, target: Callable = _run_training_job):
+        """
+        Queues a training run (or, with target=run_search_job, a hyperparameter search). `on_success(job, metrics)`
+        runs in the parent once the worker returns (used to load the new model). Returns (job_id, future).
+        """
+        with self._lock:
+            self._ensure_started()
+            self._prune()
+            job_id = f"job_{uuid.uuid4().hex[:12]}"
+            progress = self._manager.dict(stage="queued", round=0, total_rounds=None)
+            job = {"job_id": job_id, "status": "queued", "progress": progress, "request": kwargs,
+                   "created_at": time.time(), "finished_at": None, "model_id": None, "metrics": None, "error": None}
+            self._jobs[job_id] = job
+            if self._state_dir is None:
+                future = self._executor.submit(target, progress, kwargs)
+            else:
+                future = self._executor.submit(_run_in_slot, target, progress, kwargs, self._state_dir, self._workers)
+                self._publish(job)
+        future.add_done_callback(lambda f: self._finish(job, f, on_success))
+        return job_id, future
+
+    def _finish(self, job: dict, future: Future, on_success):
+        try:
+            metrics = future.result()
+            if on_success is not None:
+                on_success(job, metrics)
+            job.update(status="succeeded", metrics=metrics)
+        except Exception as e:
+            job.update(status="failed", error=str(e), error_type=type(e).__name__)
+        finally:
+            try:
+                job["progress"] = dict(job["progress"])
+            except Exception:
+                job["progress"] = {}
+            job["progress"]["stage"] = job["status"]
+            record_stage_timings(job["progress"].get("stage_seconds"))
+            TRAINING_JOBS.inc(status=job["status"])
+            job["finished_at"] = time.time()
+            if self._state_dir is not None:
+                self._publish(job)
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j["finished_at"] is not None]
+        for job in sorted(finished, key=lambda j: j["finished_at"])[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            self._jobs.pop(job["job_id"], None)
+            if self._state_dir is not None:
+                try: os.remove(self._job_path(job["job_id"]))
+                except FileNotFoundError: pass
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self._state_dir, f"{job_id}.json")
+
+    def _publish(self, job: dict):
+        path = self._job_path(job["job_id"])
+        try:
+            with self._publish_lock:
+                with open(path + ".tmp", "w") as f:
+                    json.dump(self._snapshot(job), f, default=_json_default)
+                os.replace(path + ".tmp", path)
+        except Exception as e: print(f"⚠️ Job {job['job_id']} not published: {e}")
+
+    def _publish_running(self):
+        while True:
+            time.sleep(PUBLISH_SECONDS)
+            for job in [j for j in list(self._jobs.values()) if j["finished_at"] is None]:
+                self._publish(job)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """A plain-dict snapshot of the job, with progress copied out of the shared dict (or, from another process, its published file)."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return self._snapshot(job)
+        if self._state_dir is None or os.path.basename(job_id) != job_id:
+            return None
+        try:
+            with open(self._job_path(job_id), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _snapshot(job: dict) -> dict:
+        snapshot = dict(job)
+        try:
+            snapshot["progress"] = dict(job["progress"])
+        except Exception:
+            snapshot["progress"] = {}
+        if snapshot["status"] == "queued" and snapshot["progress"].get("stage", "queued") != "queued":
+            snapshot["status"] = "running"
+        return snapshot
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._executor, self._manager = None, None
@@ -9,86 +9,226 @@ from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score,
     roc_auc_score, balanced_accuracy_score, confusion_matrix
 )
-import joblib
 import numpy as np
 import os
-import json
 import pyarrow.parquet as pq
 
-# --- START OF CHANGES ---
-# Import SMOTE for handling class imbalance
-from imblearn.over_sampling import SMOTE
-# --- END OF CHANGES ---
+from app.ml.dataset_index import load_index, read_range, to_naive_timestamp
+from app.ml.drift import build_reference, reference_sample
+from app.ml.feature_cache import load_feature_cache, training_feature_columns
+from app.ml.out_of_core import (
+    ArrayBatchIter, ParquetBatchIter, batch_labels, batch_rows_for, check_training_mode, class_balance_weight, predict_array,
+    predict_range, scale_pos_weight_for, train_out_of_core
+)
+from app.ml.predictor import table_to_matrix
+from app.ml.registry import MODEL_FILE, load_manifest, missing_value_for, save_model_artifacts
+from app.ml.telemetry import timed
+from app.ml.thresholds import curve_points, optimize_threshold
 
 # Import paths from the main app's namespace
-from app.main import PROCESSED_DATA_PATH, MODEL_PATH, MODEL_COLUMNS_PATH, THRESHOLD_PATH
+from app.main import PROCESSED_DATA_PATH
 
-def train_model_on_range(train_start: str, train_end: str, test_start: str, test_end: str):
-    if not os.path.exists(PROCESSED_DATA_PATH):
-        raise FileNotFoundError("Parquet dataset not found. Please upload a dataset first.")
+N_ESTIMATORS = 150
+# Booster settings for a plain /train-model run; a hyperparameter search (tuning.py) overrides them
+DEFAULT_HYPERPARAMETERS = {"max_depth": 5, "learning_rate": 0.05, "subsample": 0.8, "colsample_bytree": 0.8}
+INCREMENTAL_ROUNDS = int(os.getenv("INCREMENTAL_ROUNDS", "50"))  # trees added per warm-start retrain
 
-    schema = pq.read_schema(PROCESSED_DATA_PATH)
-    id_column_name = schema.names[0]
-    exclude_cols = ['Response', 'Response_mapped', 'synthetic_timestamp', id_column_name]
-    numeric_types = ['int', 'float', 'double']
-    feature_cols = [
-        field.name for field in schema
-        if field.name not in exclude_cols and any(t in str(field.type).lower() for t in numeric_types)
-    ]
-    if not feature_cols:
-        raise ValueError("No numeric feature columns found for training.")
-    
-    cols_to_load = feature_cols + ['Response', 'synthetic_timestamp']
 
-    train_filters = [('synthetic_timestamp', '>=', pd.to_datetime(train_start)), ('synthetic_timestamp', '<=', pd.to_datetime(train_end))]
-    test_filters = [('synthetic_timestamp', '>=', pd.to_datetime(test_start)), ('synthetic_timestamp', '<=', pd.to_datetime(test_end))]
-    
-    train_df = pd.read_parquet(PROCESSED_DATA_PATH, columns=cols_to_load, filters=train_filters)
-    test_df = pd.read_parquet(PROCESSED_DATA_PATH, columns=cols_to_load, filters=test_filters)
+class ProgressCallback(xgb.callback.TrainingCallback):
+    """Publishes the boosting round to a (possibly cross-process) progress dict."""
+
+    def __init__(self, progress):
+        self.progress = progress
+
+    def after_iteration(self, model, epoch, evals_log):
+        self.progress["round"] = epoch + 1
+        return False
+
 
-    if train_df.empty or test_df.empty:
+def _report(progress, **fields):
+    if progress is not None:
+        progress.update(fields)
+
+
+def _load_windows(feature_cols, train_start, train_end, test_start, test_end, cache):
+    """(X_train, y_train, X_test, y_test) as float32 matrices with NaN for missing values; zero-copy views when the feature cache is available."""
+    if cache is not None:
+        windows = [cache.window(train_start, train_end), cache.window(test_start, test_end)]
+    else:
+        # read_range opens only the row groups overlapping each window (see dataset_index.py)
+        tables = [read_range(PROCESSED_DATA_PATH, start, end, columns=feature_cols + ['Response']) for start, end in ((train_start, train_end), (test_start, test_end))]
+        windows = [(table_to_matrix(table, feature_cols, np.nan), batch_labels(table)) for table in tables]
+    if any(len(labels) == 0 for _, labels in windows):
         raise ValueError("No training or testing data found for the selected date ranges.")
+    (X_train, y_train), (X_test, y_test) = windows
+    return X_train, np.asarray(y_train, dtype=int), X_test, np.asarray(y_test, dtype=int)
+
+
+def _has_missing(matrix) -> bool:
+    step = batch_rows_for(matrix.shape[1])
+    return any(np.isnan(matrix[i:i + step]).any() for i in range(0, len(matrix), step))
 
-    train_df['Response_mapped'] = train_df['Response'].map({'pass': 1, 'fail': 0})
-    test_df['Response_mapped'] = test_df['Response'].map({'pass': 1, 'fail': 0})
-    
-    X_train, y_train = train_df[feature_cols].fillna(0), train_df['Response_mapped']
-    X_test, y_test = test_df[feature_cols].fillna(0), test_df['Response_mapped']
+
+def _train_in_memory(feature_cols, train_start, train_end, test_start, test_end, progress, timings, cache=None,
+                     hyperparameters=DEFAULT_HYPERPARAMETERS, num_rounds=N_ESTIMATORS):
+    """
+    Loads both windows and balances the training window with SMOTE. SMOTE cannot interpolate missing
+    values (it would invent zeros where a station measured nothing), so windows with missing values
+    are passed to XGBoost as they are, NaN-as-missing, and balanced with scale_pos_weight instead.
+    """
+    with timed("parquet_read", timings):
+        X_train, y_train, X_test, y_test = _load_windows(feature_cols, train_start, train_end, test_start, test_end, cache)
 
     # --- START OF CHANGES ---
     # Apply SMOTE to the training data to create synthetic minority samples
-    print("Original training set shape %s" % str(y_train.value_counts()))
-    sm = SMOTE(random_state=42)
-    X_train_res, y_train_res = sm.fit_resample(X_train, y_train)
-    print("Resampled training set shape %s" % str(y_train_res.value_counts()))
+    _report(progress, stage="resampling")
+    print("Original training set shape %s" % str(pd.Series(y_train).value_counts()))
+    if _has_missing(X_train):
+        _, scale_pos_weight = scale_pos_weight_for(len(y_train), int(np.count_nonzero(y_train)))
+        X_train_res, y_train_res, balance = X_train, y_train, {"scale_pos_weight": scale_pos_weight}
+        print(f"Training window has missing values: kept as missing, scale_pos_weight={scale_pos_weight:.3f} instead of SMOTE")
+    else:
+        from imblearn.over_sampling import SMOTE  # ~0.5 s to import; only this branch needs it
+        sm = SMOTE(random_state=42)
+        with timed("smote", timings): X_train_res, y_train_res = sm.fit_resample(X_train, y_train)
+        print("Resampled training set shape %s" % str(pd.Series(y_train_res).value_counts()))
+        balance = {}
     # --- END OF CHANGES ---
 
-    # We no longer need scale_pos_weight because SMOTE has balanced the dataset
+    # We no longer need scale_pos_weight when SMOTE has balanced the dataset
+    _report(progress, stage="training")
     model = xgb.XGBClassifier(
-        n_estimators=150, learning_rate=0.05, max_depth=5, subsample=0.8,
-        colsample_bytree=0.8,
+        n_estimators=num_rounds, **hyperparameters,
         eval_metric=['logloss', 'error'],
-        random_state=42, use_label_encoder=False
+        random_state=42, use_label_encoder=False,
+        callbacks=[ProgressCallback(progress)] if progress is not None else None,
+        **balance
     )
     
-    # Use the resampled data for training
-    eval_set = [(X_train_res, y_train_res), (X_test, y_test)]
-    model.fit(X_train_res, y_train_res, eval_set=eval_set, verbose=False)
-
-    model.save_model(MODEL_PATH)
-    joblib.dump(feature_cols, MODEL_COLUMNS_PATH)
-
-    y_proba = model.predict_proba(X_test)[:, 1]
-    thresholds = np.linspace(0.05, 0.95, 181) 
-    best_f1, best_threshold = 0, 0.5
-    for thr in thresholds:
-        f1 = f1_score(y_test, (y_proba >= thr).astype(int), zero_division=0)
-        if f1 > best_f1:
-            best_f1, best_threshold = f1, thr
-
-    with open(THRESHOLD_PATH, "w") as f:
-        json.dump({"best_threshold": float(best_threshold)}, f)
-    
+    # Use the resampled data for training. Only the training curve is reported (the test window is scored
+    # once below); evaluating it every round is costly once missing values go through the quantized matrix.
+    eval_set = [(X_train_res, y_train_res)]
+    with timed("fit", timings): model.fit(X_train_res, y_train_res, eval_set=eval_set, verbose=False)
+
+    _report(progress, stage="evaluating")
+    with timed("predict_proba", timings): y_proba = model.predict_proba(X_test)[:, 1]
+    model.get_booster().feature_names = feature_cols  # fitted on arrays; keep the names for feature importance and warm starts
+    return model, y_test, y_proba, model.evals_result()
+
+
+def _train_out_of_core(feature_cols, train_start, train_end, test_start, test_end, progress, training_mode, timings, cache=None,
+                       base_booster=None, num_rounds=N_ESTIMATORS, missing=np.nan, hyperparameters=DEFAULT_HYPERPARAMETERS):
+    """Streams the training window into XGBoost and weights the classes instead of resampling. Continues `base_booster` if given."""
+    _report(progress, stage="counting classes")
+    if cache is not None:
+        (X_train, y_train), (X_test, y_test) = cache.window(train_start, train_end), cache.window(test_start, test_end)
+        if len(y_test) == 0:
+            raise ValueError("No training or testing data found for the selected date ranges.")
+        train_rows, scale_pos_weight = scale_pos_weight_for(len(y_train), int(np.count_nonzero(y_train)))
+        make_batches = lambda cache_prefix: ArrayBatchIter(X_train, y_train, feature_cols, cache_prefix)
+    else:
+        if read_range(PROCESSED_DATA_PATH, test_start, test_end, columns=['Response']).num_rows == 0:
+            raise ValueError("No training or testing data found for the selected date ranges.")
+        train_rows, scale_pos_weight = class_balance_weight(PROCESSED_DATA_PATH, train_start, train_end)
+        make_batches = lambda cache_prefix: ParquetBatchIter(PROCESSED_DATA_PATH, train_start, train_end, feature_cols, cache_prefix, missing)
+    print(f"Out-of-core training on {train_rows} rows ({training_mode}{', warm start' if base_booster is not None else ''}), scale_pos_weight={scale_pos_weight:.3f}")
+
+    _report(progress, stage="training")
+    params = {"objective": "binary:logistic", **hyperparameters, "eval_metric": ["logloss", "error"], "seed": 42, "scale_pos_weight": scale_pos_weight}
+    with timed("fit", timings):  # includes decoding the streamed batches
+        booster, evals_result = train_out_of_core(params, num_rounds, make_batches, training_mode, callbacks=[ProgressCallback(progress)] if progress is not None else None,
+                                                  xgb_model=base_booster)
+
+    _report(progress, stage="evaluating")
+    with timed("predict_proba", timings):
+        if cache is not None:
+            y_test, y_proba = np.asarray(y_test, dtype=int), predict_array(booster, X_test)
+        else:
+            y_test, y_proba = predict_range(booster, PROCESSED_DATA_PATH, test_start, test_end, feature_cols, missing)
+    return booster, y_test, y_proba, evals_result
+
+
+def _train_incremental(base_model_dir, train_end, test_start, test_end, progress, training_mode, timings, cache):
+    """
+    Continues the model in `base_model_dir` with INCREMENTAL_ROUNDS trees fitted on only the rows after its
+    training window, so the cost follows the new data rather than the history. Returns the feature columns,
+    the usual training results and the manifest fields recording the lineage.
+    """
+    base = load_manifest(base_model_dir)
+    base_window = base.get("training_window") or {}
+    if "train_end" not in base_window:
+        raise ValueError(f"Model {base['model_id']} has no recorded training window to continue from.")
+    new_start = to_naive_timestamp(base_window["train_end"]) + pd.Timedelta(1, unit="ns")
+    if to_naive_timestamp(train_end) < new_start:
+        raise ValueError(f"trainEnd must be after the end of {base['model_id']}'s training window ({base_window['train_end']}).")
+
+    # The added trees must see the base model's columns, in its order
+    feature_cols = base["columns"]
+    missing = set(feature_cols) - set(pq.read_schema(PROCESSED_DATA_PATH).names)
+    if missing:
+        raise ValueError(f"The dataset lacks {len(missing)} of the base model's feature columns (e.g. '{sorted(missing)[0]}').")
+    # Models from before NaN-as-missing keep seeing zeros; the cache stores NaN, so they read Parquet
+    missing = missing_value_for(base)
+    if cache is not None and (cache.columns != feature_cols or not np.isnan(missing)):
+        cache = None
+
+    # SMOTE is unreliable on a few hours of rows, so the new window is always class-weighted
+    training_mode = "streaming" if training_mode == "in_memory" else training_mode
+    # Added trees follow the base model's settings (tuned ones included)
+    hyperparameters = base.get("hyperparameters", DEFAULT_HYPERPARAMETERS)
+    base_booster = xgb.Booster(model_file=os.path.join(base_model_dir, MODEL_FILE))
+    model, y_test, y_proba, evals_result = _train_out_of_core(feature_cols, new_start, train_end, test_start, test_end, progress, training_mode,
+                                                              timings, cache, base_booster, INCREMENTAL_ROUNDS, missing, hyperparameters)
+    lineage = {
+        "hyperparameters": hyperparameters, "num_rounds": INCREMENTAL_ROUNDS, "training_mode": training_mode, "missing_value": "nan" if np.isnan(missing) else 0, "parent_model_id": base["model_id"], "lineage": base.get("lineage", []) + [base["model_id"]],
+        "incremental_window": {"after": base_window["train_end"], "train_end": train_end},
+        "training_window": {"train_start": base_window["train_start"], "train_end": train_end, "test_start": test_start, "test_end": test_end},
+    }
+    return feature_cols, model, y_test, y_proba, evals_result, lineage
+
+
+def train_model_on_range(train_start: str, train_end: str, test_start: str, test_end: str, model_dir: str, progress=None,
+                         threshold_objective: str = "f1", min_precision: float = None, training_mode: str = "in_memory",
+                         base_model_dir: str = None, hyperparameters: dict = None, num_rounds: int = N_ESTIMATORS, **manifest_extra):
+    """
+    Trains a model on the given windows and saves it as a new registry version in `model_dir`.
+    The decision threshold is tuned on the test window for `threshold_objective` (see thresholds.py).
+    `training_mode` "in_memory" loads both windows and balances them with SMOTE; "streaming" and
+    "external_memory" train out of core with class weights (see out_of_core.py).
+    With `base_model_dir`, that registry version is warm-started on the rows added since its training window.
+    `hyperparameters` override DEFAULT_HYPERPARAMETERS for `num_rounds` trees; `manifest_extra` is recorded as is.
+    """
+    check_training_mode(training_mode)
+    _report(progress, stage="loading data", round=0, total_rounds=num_rounds if base_model_dir is None else INCREMENTAL_ROUNDS)
+    if not os.path.exists(PROCESSED_DATA_PATH):
+        raise FileNotFoundError("Parquet dataset not found. Please upload a dataset first.")
+
+    # The decoded feature cache (built after upload) turns both windows into slices of mapped arrays
+    cache = load_feature_cache(PROCESSED_DATA_PATH)
+    # Stage timings travel back with the job's progress; the API process records them in /metrics
+    timings = {}
+    hyperparameters = dict(DEFAULT_HYPERPARAMETERS, **(hyperparameters or {}))
+    manifest_fields = {
+        **manifest_extra, "hyperparameters": hyperparameters, "num_rounds": num_rounds, "training_mode": training_mode, "missing_value": "nan", "dataset_hash": (load_index(PROCESSED_DATA_PATH) or {}).get("content_hash"),
+        "training_window": {"train_start": train_start, "train_end": train_end, "test_start": test_start, "test_end": test_end},
+    }
+
+    # Columns the ingest-time stats show to be empty or constant are left out (see column_stats.py)
+    feature_cols = cache.columns if cache is not None else training_feature_columns(PROCESSED_DATA_PATH, pq.read_schema(PROCESSED_DATA_PATH))
+    if not feature_cols:
+        raise ValueError("No numeric feature columns found for training.")
+
+    if base_model_dir is not None:
+        feature_cols, model, y_test, y_proba, evals_result, lineage = _train_incremental(base_model_dir, train_end, test_start, test_end, progress, training_mode, timings, cache)
+        manifest_fields.update(lineage)
+    elif training_mode == "in_memory":
+        model, y_test, y_proba, evals_result = _train_in_memory(feature_cols, train_start, train_end, test_start, test_end, progress, timings, cache,
+                                                                hyperparameters, num_rounds)
+    else:
+        model, y_test, y_proba, evals_result = _train_out_of_core(feature_cols, train_start, train_end, test_start, test_end, progress, training_mode, timings, cache,
+                                                                  num_rounds=num_rounds, hyperparameters=hyperparameters)
+    with timed("threshold_search", timings): best_threshold, curve = optimize_threshold(y_test, y_proba, threshold_objective, min_precision)
+
     y_pred = (y_proba >= best_threshold).astype(int)
 
     metrics_dict = {
@@ -105,7 +245,6 @@ def train_model_on_range(train_start: str, train_end: str, test_start: str, test
     cm = confusion_matrix(y_test, y_pred)
     metrics_percent['confusion_matrix'] = cm.tolist()
 
-    evals_result = model.evals_result()
     train_loss = evals_result['validation_0']['logloss']
     train_accuracy = [1.0 - x for x in evals_result['validation_0']['error']] 
 
@@ -118,5 +257,15 @@ def train_model_on_range(train_start: str, train_end: str, test_start: str, test
         })
     
     metrics_percent['training_history'] = history
+    metrics_percent['threshold_curve'] = curve_points(curve)
+
+    # Reference histograms for drift monitoring: the training window's features, the test window's scores
+    with timed("drift_reference", timings):
+        window = manifest_fields["training_window"]
+        sample = reference_sample(PROCESSED_DATA_PATH, cache, feature_cols, window["train_start"], window["train_end"], missing_value_for(manifest_fields))
+        reference = build_reference(sample, feature_cols, y_proba)
 
+    save_model_artifacts(model_dir, model, feature_cols, best_threshold, metrics_percent, reference=reference,
+                         threshold_objective=threshold_objective, min_precision=min_precision, **manifest_fields)
+    _report(progress, stage_seconds=timings)
     return metrics_percent
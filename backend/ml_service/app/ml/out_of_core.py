@@ -0,0 +1,140 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/out_of_core.py
+# Out-of-core training. Record batches of a Parquet time window are fed
+# to XGBoost through a DataIter, so the training window is never loaded
+# as a DataFrame: QuantileDMatrix keeps only the quantized (1 byte per
+# value) matrix in memory, and ExtMemQuantileDMatrix pages even that to
+# disk. Batches come from the Parquet file, or from the decoded feature
+# cache when one exists. Class imbalance is handled with scale_pos_weight
+# instead of materializing SMOTE samples.
+# ===================================================================
+
+import os
+import shutil
+import tempfile
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pyarrow.compute as pc
+import xgboost as xgb
+
+from .dataset_index import iter_range_batches, read_range
+from .predictor import table_to_matrix
+
+TRAINING_MODES = ("in_memory", "streaming", "external_memory")
+TRAINING_BATCH_BYTES = 4 << 20  # float32 feature bytes handed to XGBoost per batch; larger batches mostly add allocator slack
+MAX_BIN = 256
+EXTERNAL_MEMORY_CACHE_DIR = os.getenv("XGB_CACHE_DIR")  # None -> system temp dir
+
+
+def check_training_mode(training_mode: str):
+    if training_mode not in TRAINING_MODES:
+        raise ValueError(f"Unknown training mode '{training_mode}'. Expected one of: {', '.join(TRAINING_MODES)}.")
+
+
+def batch_rows_for(feature_count: int) -> int:
+    return max(1_024, TRAINING_BATCH_BYTES // (4 * max(1, feature_count)))
+
+
+def batch_labels(batch) -> np.ndarray:
+    return pc.equal(batch.column("Response"), "pass").to_numpy(zero_copy_only=False).astype(np.float32)
+
+
+class ParquetBatchIter(xgb.DataIter):
+    """Hands one record batch of [start, end] at a time to XGBoost (missing values -> `missing`, as at inference)."""
+
+    def __init__(self, parquet_path: str, start, end, feature_cols: List[str], cache_prefix: str = None, missing: float = np.nan):
+        self.parquet_path, self.start, self.end = parquet_path, start, end
+        self.feature_cols, self.missing = list(feature_cols), missing
+        self.batch_size = batch_rows_for(len(feature_cols))
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._batches = None
+
+    def next(self, input_data) -> bool:
+        if self._batches is None:
+            self._batches = iter_range_batches(self.parquet_path, self.start, self.end,
+                                               columns=self.feature_cols + ["Response"], batch_size=self.batch_size)
+        batch = next(self._batches, None)
+        if batch is None:
+            return False
+        input_data(data=table_to_matrix(batch, self.feature_cols, self.missing), label=batch_labels(batch), feature_names=self.feature_cols)
+        return True
+
+
+class ArrayBatchIter(xgb.DataIter):
+    """Hands row slices of an in-memory or memory-mapped feature matrix to XGBoost."""
+
+    def __init__(self, features: np.ndarray, labels: np.ndarray, feature_cols: List[str], cache_prefix: str = None):
+        self.features, self.labels = features, labels
+        self.feature_cols = list(feature_cols)
+        self.batch_size = batch_rows_for(len(feature_cols))
+        self._offset = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._offset = 0
+
+    def next(self, input_data) -> bool:
+        if self._offset >= len(self.labels):
+            return False
+        rows = slice(self._offset, self._offset + self.batch_size)
+        input_data(data=self.features[rows], label=self.labels[rows], feature_names=self.feature_cols)
+        self._offset += self.batch_size
+        return True
+
+
+def class_balance_weight(parquet_path: str, start, end) -> Tuple[int, float]:
+    """(rows, scale_pos_weight) for the window; the weight makes both classes count equally in the loss."""
+    labels = read_range(parquet_path, start, end, columns=["Response"]).column("Response")
+    return scale_pos_weight_for(len(labels), pc.sum(pc.equal(labels, "pass")).as_py() or 0)
+
+
+def scale_pos_weight_for(rows: int, positives: int) -> Tuple[int, float]:
+    if rows == 0:
+        raise ValueError("No training or testing data found for the selected date ranges.")
+    if positives in (0, rows):
+        raise ValueError("The training window must contain both 'pass' and 'fail' rows.")
+    return rows, (rows - positives) / positives
+
+
+def predict_range(booster: xgb.Booster, parquet_path: str, start, end, feature_cols: List[str], missing: float = np.nan) -> Tuple[np.ndarray, np.ndarray]:
+    """Labels and pass probabilities for every row of the window, scored batch by batch."""
+    labels, probas = [], []
+    for batch in iter_range_batches(parquet_path, start, end, columns=feature_cols + ["Response"], batch_size=batch_rows_for(len(feature_cols))):
+        labels.append(batch_labels(batch).astype(int))
+        probas.append(booster.inplace_predict(table_to_matrix(batch, feature_cols, missing)))
+    if not labels:
+        raise ValueError("No training or testing data found for the selected date ranges.")
+    return np.concatenate(labels), np.concatenate(probas)
+
+
+def predict_array(booster: xgb.Booster, features: np.ndarray) -> np.ndarray:
+    """Pass probabilities for a (possibly memory-mapped) matrix, scored in bounded slices."""
+    step = batch_rows_for(features.shape[1])
+    return np.concatenate([booster.inplace_predict(features[i:i + step]) for i in range(0, len(features), step)] or [np.empty(0, np.float32)])
+
+
+def train_out_of_core(params: dict, num_rounds: int, make_batches: Callable[[Optional[str]], xgb.DataIter],
+                      training_mode: str = "streaming", callbacks=None, xgb_model: Optional[xgb.Booster] = None) -> Tuple[xgb.Booster, dict]:
+    """
+    Trains a booster on the batches of `make_batches(cache_prefix)` without materializing them together.
+    Returns (booster, evals_result) with the training-set curve under 'validation_0', like XGBClassifier.
+    With `xgb_model`, boosting continues from that model and `num_rounds` trees are added to it.
+    """
+    cache_dir = tempfile.mkdtemp(prefix="xgb_cache_", dir=EXTERNAL_MEMORY_CACHE_DIR) if training_mode == "external_memory" else None
+    try:
+        if cache_dir is not None:
+            dtrain = xgb.ExtMemQuantileDMatrix(make_batches(os.path.join(cache_dir, "train")), max_bin=MAX_BIN)
+        else:
+            dtrain = xgb.QuantileDMatrix(make_batches(None), max_bin=MAX_BIN)
+        evals_result = {}
+        booster = xgb.train(dict(params, tree_method="hist", max_bin=MAX_BIN), dtrain, num_boost_round=num_rounds,
+                            evals=[(dtrain, "validation_0")], evals_result=evals_result, verbose_eval=False, callbacks=callbacks, xgb_model=xgb_model)
+        del dtrain
+        return booster, evals_result
+    finally:
+        if cache_dir is not None:
+            shutil.rmtree(cache_dir, ignore_errors=True)
@@ -0,0 +1,87 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/predictor.py
+# Vectorized scoring helpers shared by the prediction endpoints, and the
+# per-model InferenceEngine used for low-latency single-row scoring.
+# Missing values become `missing`: NaN (XGBoost's own "missing") for
+# models trained since that became the default, 0 for older ones.
+# ===================================================================
+
+import threading
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+def records_to_matrix(records: List[dict], model_columns: List[str], missing: float = 0.0) -> np.ndarray:
+    """Aligns a list of row dicts to the model columns in one pass."""
+    frame = pd.DataFrame(records, columns=model_columns)
+    return frame.to_numpy(dtype=np.float32, na_value=missing)
+
+
+def table_to_matrix(table: pa.Table, model_columns: List[str], missing: float = 0.0) -> np.ndarray:
+    """Aligns an Arrow table to the model columns without going through pandas."""
+    matrix = np.full((table.num_rows, len(model_columns)), missing, dtype=np.float32)
+    available = set(table.column_names)
+    for j, name in enumerate(model_columns):
+        if name in available:
+            column = pc.fill_null(table.column(name).cast(pa.float32()), missing)
+            matrix[:, j] = column.to_numpy()
+    if not np.isnan(missing):
+        matrix[np.isnan(matrix)] = missing
+    return matrix
+
+
+class InferenceEngine:
+    """
+    Built once when a model is loaded. Precomputes the feature-name -> column mapping and scores
+    through Booster.inplace_predict, skipping the DataFrame/DMatrix construction of predict_proba.
+    Single rows are written into a reusable per-thread buffer straight from the request dict.
+    """
+
+    def __init__(self, booster, columns: List[str], missing: float = 0.0):
+        self.booster = booster
+        self.columns = list(columns)
+        self.missing = missing
+        self.index = {name: j for j, name in enumerate(self.columns)}
+        self._local = threading.local()
+
+    def _row_buffer(self) -> np.ndarray:
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = self._local.row = np.zeros((1, len(self.columns)), dtype=np.float32)
+        return row
+
+    def fill_row(self, data: dict) -> np.ndarray:
+        """Same alignment as reindex(columns).fillna(missing): unknown keys are ignored, absent/None/NaN values become `missing`."""
+        row, index = self._row_buffer(), self.index
+        row.fill(self.missing)
+        for name, value in data.items():
+            j = index.get(name)
+            if j is not None and value is not None and value == value:
+                row[0, j] = value
+        return row
+
+    def predict_row(self, data: dict) -> np.float32:
+        return self.booster.inplace_predict(self.fill_row(data))[0]
+
+    def predict_matrix(self, matrix: np.ndarray) -> np.ndarray:
+        if matrix.shape[0] == 0:
+            return np.empty(0, dtype=np.float32)
+        return self.booster.inplace_predict(matrix)
+
+
+def format_prediction(proba: np.float32, threshold: float) -> dict:
+    return {"prediction": "Pass" if proba >= threshold else "Fail", "confidence": round(float(max(proba, 1 - proba)) * 100, 2)}
+
+
+def format_predictions(proba: np.ndarray, threshold: float) -> List[dict]:
+    """Turns probabilities into the same {prediction, confidence} payload as /predict."""
+    passed = proba >= threshold
+    confidence = np.maximum(proba, 1 - proba).astype(np.float64) * 100
+    return [
+        {"prediction": "Pass" if p else "Fail", "confidence": round(c, 2)}
+        for p, c in zip(passed.tolist(), confidence.tolist())
+    ]
@@ -0,0 +1,234 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/registry.py
+# Versioned model registry. Every trained model is stored under its own
+# id (model/registry/<model_id>/) together with its columns, threshold
+# and metrics. The in-memory side keeps a bounded LRU of loaded models
+# and swaps the active one with a single reference assignment, so a
+# request never sees one model's columns paired with another's booster.
+# Several processes serving the same model directory (app/serve.py
+# workers) converge on the model named by the on-disk active pointer.
+# ===================================================================
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import xgboost as xgb
+
+from .drift import DriftMonitor, load_reference, write_reference
+from .predictor import InferenceEngine
+from .telemetry import MODEL_LOAD_SECONDS, set_active_model
+
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "4"))
+ACTIVE_CHECK_SECONDS = float(os.getenv("ACTIVE_CHECK_SECONDS", "1.0"))  # how often `active` looks for an activation by another process
+MODEL_FILE = "model.xgb"
+MANIFEST_FILE = "manifest.json"
+ACTIVE_POINTER_FILE = "active_model.json"
+MODEL_ID_PATTERN = re.compile(r"model_[0-9a-f]{8}|legacy")  # new_model_id()'s ids, and the pre-registry model
+
+
+class ModelEntry(NamedTuple):
+    model_id: str
+    model: xgb.XGBClassifier
+    columns: List[str]
+    threshold: float
+    metrics: dict
+    manifest: dict
+    engine: InferenceEngine
+    drift: Optional[DriftMonitor] = None  # None for models saved without reference histograms
+
+
+def build_entry(model_id: str, model: xgb.XGBClassifier, columns: List[str], threshold: float, metrics: dict = None, manifest: dict = None,
+                reference: dict = None) -> ModelEntry:
+    """Bundles a loaded model with its fast-path inference engine and, given its reference histograms, a drift monitor."""
+    engine = InferenceEngine(model.get_booster(), columns, missing_value_for(manifest or {}))
+    drift = DriftMonitor(reference) if reference is not None and reference["columns"] == list(columns) else None
+    return ModelEntry(model_id, model, list(columns), threshold, metrics or {}, manifest or {}, engine, drift)
+
+
+def missing_value_for(manifest: dict) -> float:
+    """How a model expects missing values: as NaN if it was trained that way (recorded as "nan"), else as 0."""
+    return np.nan if manifest.get("missing_value") == "nan" else 0.0
+
+
+def new_model_id() -> str:
+    return f"model_{uuid.uuid4().hex[:8]}"
+
+
+def is_model_id(model_id: str) -> bool:
+    """Whether `model_id` has the shape of an id this registry hands out; anything else (e.g. "../x") never reaches a path."""
+    return MODEL_ID_PATTERN.fullmatch(model_id) is not None
+
+
+def save_model_artifacts(model_dir: str, model, columns: List[str], threshold: float, metrics: dict, reference: dict = None, **manifest_fields):
+    """
+    Writes a model version (booster + manifest, and the drift reference if given) into `model_dir`. Files are
+    written into a staging directory that is renamed into place, so a partially written model is never visible.
+    """
+    staging_dir = model_dir + ".tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    model.save_model(os.path.join(staging_dir, MODEL_FILE))
+    if reference is not None:
+        write_reference(reference, staging_dir)
+    manifest = dict(manifest_fields, model_id=os.path.basename(model_dir), columns=list(columns), threshold=float(threshold),
+                    metrics=metrics, created_at=time.time())
+    with open(os.path.join(staging_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+    os.replace(staging_dir, model_dir)
+
+
+def load_manifest(model_dir: str) -> dict:
+    with open(os.path.join(model_dir, MANIFEST_FILE), "r") as f:
+        return json.load(f)
+
+
+def load_model_entry(model_dir: str) -> ModelEntry:
+    start = time.perf_counter()
+    manifest = load_manifest(model_dir)
+    model = xgb.XGBClassifier(); model.load_model(os.path.join(model_dir, MODEL_FILE))
+    entry = build_entry(manifest["model_id"], model, manifest["columns"], manifest.get("threshold", 0.5), manifest.get("metrics", {}), manifest,
+                        load_reference(model_dir))
+    MODEL_LOAD_SECONDS.observe(time.perf_counter() - start)
+    return entry
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: str, capacity: int = MODEL_CACHE_SIZE):
+        self.model_dir = model_dir
+        self.capacity = max(1, capacity)
+        self._cache: "OrderedDict[str, ModelEntry]" = OrderedDict()
+        self._active: Optional[ModelEntry] = None
+        self._lock = threading.RLock()
+        self._pointer_mtime: Optional[int] = None  # of the active pointer this process last wrote or followed
+        self._next_pointer_check = 0.0
+
+    @property
+    def versions_dir(self) -> str:
+        return os.path.join(self.model_dir, "registry")
+
+    def path_for(self, model_id: str) -> str:
+        return os.path.join(self.versions_dir, model_id)
+
+    @property
+    def pointer_path(self) -> str:
+        return os.path.join(self.model_dir, ACTIVE_POINTER_FILE)
+
+    @property
+    def active(self) -> Optional[ModelEntry]:
+        if time.monotonic() >= self._next_pointer_check:
+            self._follow_pointer()
+        return self._active
+
+    def get(self, model_id: Optional[str] = None) -> Optional[ModelEntry]:
+        """The active model, or a specific version (loaded from disk into the LRU on a miss). KeyError if unknown."""
+        if model_id is None:
+            return self.active
+        if not is_model_id(model_id):
+            raise KeyError(model_id)
+        with self._lock:
+            entry = self._cache.get(model_id)
+            if entry is not None:
+                self._cache.move_to_end(model_id)
+                return entry
+            active = self._active
+            if active is not None and active.model_id == model_id:
+                return active
+            if not os.path.exists(os.path.join(self.path_for(model_id), MANIFEST_FILE)):
+                raise KeyError(model_id)
+            entry = load_model_entry(self.path_for(model_id))
+            self._remember(entry)
+            return entry
+
+    def _remember(self, entry: ModelEntry):
+        self._cache[entry.model_id] = entry
+        self._cache.move_to_end(entry.model_id)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+    def activate(self, model_id: str) -> ModelEntry:
+        """
+        Makes `model_id` the active model: persists the pointer, then swaps the in-memory reference. Only registry
+        versions can be activated (KeyError otherwise): a pointer to "legacy" could not be restored at startup.
+        """
+        if not is_model_id(model_id) or not os.path.exists(os.path.join(self.path_for(model_id), MANIFEST_FILE)):
+            raise KeyError(model_id)
+        entry = self.get(model_id)
+        os.makedirs(self.model_dir, exist_ok=True)
+        with open(self.pointer_path + ".tmp", "w") as f:
+            json.dump({"model_id": model_id}, f)
+        os.replace(self.pointer_path + ".tmp", self.pointer_path)
+        with self._lock:
+            self._pointer_mtime = os.stat(self.pointer_path).st_mtime_ns
+            self._set_active(entry)
+        return entry
+
+    def load_active(self) -> Optional[ModelEntry]:
+        """Restores the active model recorded on disk (used at startup). Returns None if there is none."""
+        if not os.path.exists(self.pointer_path):
+            return None
+        with self._lock:
+            self._pointer_mtime = os.stat(self.pointer_path).st_mtime_ns
+            with open(self.pointer_path, "r") as f:
+                model_id = json.load(f)["model_id"]
+            entry = self.get(model_id)
+            self._set_active(entry)
+        return entry
+
+    def _follow_pointer(self):
+        """
+        Switches to the model another process activated since: one stat() of the pointer per ACTIVE_CHECK_SECONDS,
+        and a load only when it changed. A pointer to a model that cannot be loaded leaves the current one serving.
+        """
+        self._next_pointer_check = time.monotonic() + ACTIVE_CHECK_SECONDS
+        try:
+            mtime = os.stat(self.pointer_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._pointer_mtime:
+            return
+        with self._lock:
+            if mtime == self._pointer_mtime:
+                return
+            self._pointer_mtime = mtime
+            try:
+                with open(self.pointer_path, "r") as f:
+                    model_id = json.load(f)["model_id"]
+                if self._active is None or self._active.model_id != model_id:
+                    self._set_active(self.get(model_id))
+                    print(f"✅ Model {model_id} activated by another worker")
+            except Exception as e: print(f"⚠️ Active model pointer not followed: {e}")
+
+    def set_active_entry(self, entry: Optional[ModelEntry]):
+        """Installs an entry that does not live in the registry (e.g. the pre-registry model files)."""
+        with self._lock:
+            if entry is not None:
+                self._remember(entry)
+            self._set_active(entry)
+
+    def _set_active(self, entry: Optional[ModelEntry]):
+        self._active = entry
+        set_active_model(entry.model_id if entry is not None else None)
+
+    def list_models(self) -> List[dict]:
+        models = []
+        if os.path.isdir(self.versions_dir):
+            for model_id in os.listdir(self.versions_dir):
+                manifest_path = os.path.join(self.path_for(model_id), MANIFEST_FILE)
+                if not os.path.exists(manifest_path): continue
+                models.append(load_manifest(self.path_for(model_id)))
+        return [self.summary(m) for m in sorted(models, key=lambda m: m.get("created_at") or 0, reverse=True)]
+
+    def summary(self, manifest: dict) -> dict:
+        """The /models listing of one version, from its manifest."""
+        model_id = manifest["model_id"]
+        return {"model_id": model_id, "created_at": manifest.get("created_at"), "threshold": manifest.get("threshold"),
+                "f1_score": manifest.get("metrics", {}).get("f1_score"), "active": self._active is not None and self._active.model_id == model_id,
+                "loaded": model_id in self._cache, "training_window": manifest.get("training_window"), "parent_model_id": manifest.get("parent_model_id")}
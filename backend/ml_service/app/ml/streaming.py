@@ -0,0 +1,68 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/streaming.py
+# Encoders that turn an iterator of Arrow record batches into chunks
+# for a StreamingResponse, so large ranges never become one big list,
+# plus the per-row scoring used by the simulation stream.
+# ===================================================================
+
+import json
+from datetime import date, datetime
+from typing import Iterable, Iterator, List
+
+import pyarrow as pa
+
+from .predictor import format_predictions, table_to_matrix
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+_ARROW_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def to_json_line(row: dict) -> str:
+    return json.dumps(row, default=_json_default) + "\n"
+
+
+def to_sse_event(event: dict) -> str:
+    return "data: " + json.dumps(event, default=_json_default) + "\n\n"
+
+
+def ndjson_chunks(batches: Iterable[pa.RecordBatch]) -> Iterator[bytes]:
+    """One JSON object per row, one chunk per record batch."""
+    for batch in batches:
+        yield "".join(to_json_line(row) for row in batch.to_pylist()).encode()
+
+
+def arrow_ipc_chunks(batches: Iterable[pa.RecordBatch], schema: pa.Schema) -> Iterator[bytes]:
+    """An Arrow IPC stream (schema, batches, end-of-stream marker) emitted message by message."""
+    yield schema.serialize().to_pybytes()
+    for batch in batches:
+        yield batch.serialize().to_pybytes()
+    yield _ARROW_EOS
+
+
+def simulation_events(batch: pa.RecordBatch, entry, include_data: bool = True) -> List[dict]:
+    """
+    Scores a record batch with a registry entry in one vectorized call and returns one event per row:
+    timestamp, prediction/confidence (same values as /predict) and the ground-truth label.
+    """
+    matrix = table_to_matrix(batch, entry.columns, entry.engine.missing)
+    proba = entry.engine.predict_matrix(matrix)
+    if entry.drift is not None:
+        entry.drift.observe(matrix, proba)
+    predictions = format_predictions(proba, entry.threshold)
+    timestamps = batch.column("synthetic_timestamp").to_pylist()
+    actuals = ["Pass" if label == "pass" else "Fail" for label in batch.column("Response").to_pylist()]
+    rows = batch.to_pylist() if include_data else None
+    events = []
+    for i, prediction in enumerate(predictions):
+        event = {"timestamp": timestamps[i], "prediction": prediction["prediction"], "confidence": prediction["confidence"], "actual": actuals[i]}
+        if rows is not None: event["data"] = rows[i]
+        events.append(event)
+    return events
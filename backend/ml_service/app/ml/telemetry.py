@@ -0,0 +1,266 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/telemetry.py
+# Service metrics in the Prometheus text format (served by /metrics):
+# request latency histograms, per-stage timings of the hot paths, row
+# throughput and model-load state. Also the opt-in request profiler:
+# with PROFILE_SAMPLE_RATE > 0 a sample of requests is run under
+# cProfile and the stats are written to PROFILE_DIR.
+# ===================================================================
+
+import contextvars
+import cProfile
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: Tuple[str, str] = None) -> str:
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        self.name, self.documentation, self.label_names = name, documentation, tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: series[i] += 1
+            series[-2] += value; series[-1] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', _format_value(bound)))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', '+Inf'))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Iterable[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REQUEST_SECONDS = REGISTRY.histogram("ml_http_request_duration_seconds", "Time until the response starts, per route.", ["method", "route", "status"])
+REQUEST_EXCEPTIONS = REGISTRY.counter("ml_http_unhandled_exceptions_total", "Requests that ended in an unhandled exception.", ["route", "exception"])
+STAGE_SECONDS = REGISTRY.histogram("ml_stage_duration_seconds", "Time spent in instrumented hot-path stages.", ["stage"])
+ROWS_TOTAL = REGISTRY.counter("ml_rows_processed_total", "Rows ingested or scored.", ["operation"])
+ROWS_PER_SECOND = REGISTRY.gauge("ml_rows_per_second", "Throughput of the most recent upload / prediction call.", ["operation"])
+MODEL_LOAD_SECONDS = REGISTRY.histogram("ml_model_load_duration_seconds", "Time to load a model version from disk.")
+ACTIVE_MODEL = REGISTRY.gauge("ml_active_model_info", "The model currently serving predictions (value is always 1).", ["model_id"])
+TRAINING_JOBS = REGISTRY.counter("ml_training_jobs_total", "Finished training jobs by outcome.", ["status"])
+DRIFT_SCORE_PSI = REGISTRY.gauge("ml_drift_score_psi", "PSI of the active model's scores since it was loaded, against its test window.", ["model_id"])
+DRIFT_FEATURES_ALERTING = REGISTRY.gauge("ml_drift_features_alerting", "Features of the active model whose PSI exceeds DRIFT_PSI_ALERT.", ["model_id"])
+
+
+# --- Stage timing ---
+@contextmanager
+def timed(stage: str, into: Optional[dict] = None):
+    """
+    Times a block as `stage`. Recorded into STAGE_SECONDS, or accumulated into `into` (used by the
+    training worker, whose registry is not the one /metrics serves). Profiled if the request is sampled.
+    """
+    session = _profile_session.get()
+    profiler = session.start_thread_profiler() if session is not None else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if profiler is not None:
+            session.stop_thread_profiler(profiler)
+        if into is not None:
+            into[stage] = into.get(stage, 0.0) + elapsed
+        else:
+            STAGE_SECONDS.observe(elapsed, stage=stage)
+
+
+def timed_call(stage: str, fn, *args, **kwargs):
+    """fn(*args, **kwargs) timed as `stage`; for run_in_threadpool, so a sampled request profiles the worker thread."""
+    with timed(stage):
+        return fn(*args, **kwargs)
+
+
+def record_stage_timings(timings: Optional[dict]):
+    for stage, seconds in (timings or {}).items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def record_rows(operation: str, rows: int, seconds: float):
+    ROWS_TOTAL.inc(rows, operation=operation)
+    if seconds > 0:
+        ROWS_PER_SECOND.set(rows / seconds, operation=operation)
+
+
+def record_drift(model_id: Optional[str], report: Optional[dict]):
+    """Refreshes the drift gauges from a DriftMonitor report (refreshed on every scrape)."""
+    DRIFT_SCORE_PSI.clear(); DRIFT_FEATURES_ALERTING.clear()
+    if model_id is not None and report is not None and report["score"] is not None:
+        DRIFT_SCORE_PSI.set(report["score"]["psi"], model_id=model_id)
+        DRIFT_FEATURES_ALERTING.set(len(report["alerts"]), model_id=model_id)
+
+
+def set_active_model(model_id: Optional[str]):
+    ACTIVE_MODEL.clear()
+    if model_id is not None:
+        ACTIVE_MODEL.set(1, model_id=model_id)
+
+
+# --- Request profiling ---
+class ProfileSession:
+    """
+    cProfile for one sampled request: the event-loop thread (which also runs any other coroutine
+    scheduled meanwhile) plus the outermost timed() stage of each worker thread the request uses.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.profilers = [cProfile.Profile()]
+        self._threads = {threading.get_ident()}
+        self._lock = threading.Lock()
+
+    def start_thread_profiler(self) -> Optional[cProfile.Profile]:
+        thread = threading.get_ident()
+        with self._lock:
+            if thread in self._threads:
+                return None  # this thread is already being profiled
+            self._threads.add(thread)
+            profiler = cProfile.Profile()
+            self.profilers.append(profiler)
+        profiler.enable()
+        return profiler
+
+    def stop_thread_profiler(self, profiler: cProfile.Profile):
+        profiler.disable()
+        with self._lock:
+            self._threads.discard(threading.get_ident())
+
+    def dump(self) -> str:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9]+', '_', self.label).strip('_')}-{uuid.uuid4().hex[:8]}.prof")
+        stats = pstats.Stats(self.profilers[0])
+        for profiler in self.profilers[1:]:
+            try: stats.add(profiler)
+            except TypeError: pass  # a profiler that never ran has no stats
+        stats.dump_stats(path)
+        return path
+
+
+_profile_session: contextvars.ContextVar[Optional[ProfileSession]] = contextvars.ContextVar("profile_session", default=None)
+_profiling = threading.Lock()  # one sampled request at a time: a thread can only run one profiler
+
+
+@contextmanager
+def maybe_profiled(label: str):
+    """
+    Runs the enclosed request handling under cProfile for a PROFILE_SAMPLE_RATE fraction of requests
+    and writes the stats to PROFILE_DIR (load them with pstats or snakeviz).
+    """
+    if PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE or not _profiling.acquire(blocking=False):
+        yield None
+        return
+    session = ProfileSession(label)
+    token = _profile_session.set(session)
+    session.profilers[0].enable()
+    try:
+        yield session
+    finally:
+        session.profilers[0].disable()
+        _profile_session.reset(token)
+        _profiling.release()
+        print(f"🔬 Profile written to {session.dump()}")
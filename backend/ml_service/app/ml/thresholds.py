@@ -0,0 +1,92 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/thresholds.py
+# Decision-threshold optimization. The confusion counts at every
+# threshold come from one sort and one cumulative sum over the test
+# scores, so the whole precision/recall/F1 curve costs O(n log n)
+# instead of one full metric pass per candidate threshold.
+# ===================================================================
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_THRESHOLD_GRID = np.linspace(0.05, 0.95, 181)
+DEFAULT_THRESHOLD = 0.5
+OBJECTIVES = ("f1", "balanced_accuracy", "recall_at_precision")
+MAX_CURVE_POINTS = 200
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """numerator / denominator with 0 where the denominator is 0 (sklearn's zero_division=0)."""
+    numerator, denominator = np.asarray(numerator, dtype=np.float64), np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def threshold_curve(y_true, scores, thresholds=None) -> dict:
+    """
+    Confusion counts and metrics for "predict positive when score >= threshold", evaluated at
+    `thresholds` (ascending), or at every distinct score when None. Returns a dict of arrays.
+    """
+    y = np.asarray(y_true).astype(bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(scores, kind="mergesort")
+    sorted_scores = scores[order]
+    # positives_from[i] = number of positives among sorted_scores[i:]
+    positives_from = np.r_[np.cumsum(y[order][::-1])[::-1], 0]
+    thresholds = np.unique(sorted_scores) if thresholds is None else np.asarray(thresholds, dtype=np.float64)
+
+    first = np.searchsorted(sorted_scores, thresholds, side="left")
+    n, positives = len(y), int(positives_from[0])
+    tp = positives_from[first]
+    fp = (n - first) - tp
+    fn, tn = positives - tp, (n - positives) - fp
+
+    precision, recall, specificity = _ratio(tp, tp + fp), _ratio(tp, positives), _ratio(tn, n - positives)
+    return {
+        "thresholds": thresholds, "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "precision": precision, "recall": recall,
+        "f1": _ratio(2 * tp, 2 * tp + fp + fn),
+        "balanced_accuracy": (recall + specificity) / 2,
+    }
+
+
+def check_objective(objective: str, min_precision: Optional[float] = None):
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown threshold objective '{objective}'. Expected one of: {', '.join(OBJECTIVES)}.")
+    if objective == "recall_at_precision" and (min_precision is None or not 0 < min_precision <= 1):
+        raise ValueError("The 'recall_at_precision' objective needs minPrecision between 0 and 1.")
+
+
+def objective_values(curve: dict, objective: str = "f1", min_precision: Optional[float] = None) -> np.ndarray:
+    check_objective(objective, min_precision)
+    if objective == "recall_at_precision":
+        return np.where(curve["precision"] >= min_precision, curve["recall"], 0.0)
+    return curve[objective]
+
+
+def optimize_threshold(y_true, scores, objective: str = "f1", min_precision: Optional[float] = None,
+                       grid=DEFAULT_THRESHOLD_GRID) -> Tuple[float, dict]:
+    """
+    Picks the threshold that maximizes `objective`, searching `grid` (or every distinct score when
+    grid is None). Ties go to the lowest threshold; if nothing scores above 0, 0.5 is kept.
+    Returns (threshold, curve over every distinct score).
+    """
+    check_objective(objective, min_precision)
+    candidates = threshold_curve(y_true, scores, grid)
+    values = objective_values(candidates, objective, min_precision)
+    best = int(np.argmax(values)) if len(values) else 0
+    threshold = float(candidates["thresholds"][best]) if len(values) and values[best] > 0 else DEFAULT_THRESHOLD
+    return threshold, (candidates if grid is None else threshold_curve(y_true, scores))
+
+
+def curve_points(curve: dict, max_points: int = MAX_CURVE_POINTS) -> List[dict]:
+    """Evenly downsamples a curve into at most `max_points` JSON-friendly points (first and last kept)."""
+    size = len(curve["thresholds"])
+    if size == 0:
+        return []
+    picks = np.unique(np.linspace(0, size - 1, min(size, max_points)).round().astype(int))
+    return [
+        {"threshold": float(curve["thresholds"][i]), "precision": float(curve["precision"][i]), "recall": float(curve["recall"][i]),
+         "f1_score": float(curve["f1"][i]), "balanced_accuracy": float(curve["balanced_accuracy"][i])}
+        for i in picks
+    ]
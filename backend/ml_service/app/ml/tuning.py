@@ -0,0 +1,215 @@
+# ===================================================================
+# FILE: backend/ml_service/app/ml/tuning.py
+# Hyperparameter search. The training window is loaded once into a
+# memory-mapped matrix (the feature cache itself when it exists), and
+# every (candidate, fold) pair is fitted in a worker process that maps
+# the same pages, so the data is neither re-read nor copied per trial.
+# Folds are expanding, time-ordered splits of the window, and each fit
+# stops early on its validation block. The best candidate is refitted
+# on the whole window by train_model_on_range, class-weighted like the
+# folds, so it becomes a registry version like any other trained model.
+# ===================================================================
+
+import itertools
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pyarrow.parquet as pq
+import xgboost as xgb
+
+from .dataset_index import iter_range_batches, read_range
+from .feature_cache import FEATURES_FILE, LABELS_FILE, load_feature_cache, training_feature_columns
+from .out_of_core import MAX_BIN, ArrayBatchIter, batch_labels, batch_rows_for, scale_pos_weight_for
+from .predictor import table_to_matrix
+
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", str(os.cpu_count() or 1)))
+SEARCH_STRATEGIES = ("grid", "random")
+SEARCH_METRIC = "logloss"  # minimized on each fold's validation block
+MIN_FOLD_ROWS = 100
+
+# The booster settings a search may vary, with the type each value is coerced to
+SEARCHABLE_PARAMETERS = {
+    "max_depth": int, "learning_rate": float, "min_child_weight": float, "subsample": float,
+    "colsample_bytree": float, "gamma": float, "reg_lambda": float, "reg_alpha": float,
+}
+DEFAULT_SEARCH_SPACE = {"max_depth": [3, 5, 7], "learning_rate": [0.05, 0.1], "min_child_weight": [1, 5]}
+
+
+def check_search(space: Optional[Dict[str, list]], strategy: str, n_iter: int, n_folds: int, max_rounds: int = 1, early_stopping_rounds: int = 1):
+    """ValueError for a request the search cannot run; called before the job is queued."""
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown search strategy '{strategy}'. Expected one of: {', '.join(SEARCH_STRATEGIES)}.")
+    for name, values in (space or {}).items():
+        if name not in SEARCHABLE_PARAMETERS:
+            raise ValueError(f"'{name}' cannot be searched. Expected some of: {', '.join(SEARCHABLE_PARAMETERS)}.")
+        if not values:
+            raise ValueError(f"The search space for '{name}' is empty.")
+    if n_iter < 1:
+        raise ValueError("nIter must be at least 1.")
+    if n_folds < 2:
+        raise ValueError("nFolds must be at least 2.")
+    if max_rounds < 1 or early_stopping_rounds < 1:
+        raise ValueError("maxRounds and earlyStoppingRounds must be at least 1.")
+
+
+def candidate_params(space: Dict[str, list], strategy: str = "grid", n_iter: int = 10, seed: int = 42) -> List[dict]:
+    """Every combination of the space ("grid"), or `n_iter` distinct ones drawn from it ("random")."""
+    names = sorted(space)
+    grid = [{name: SEARCHABLE_PARAMETERS[name](value) for name, value in zip(names, values)}
+            for values in itertools.product(*(space[name] for name in names))]
+    if strategy == "random" and n_iter < len(grid):
+        grid = random.Random(seed).sample(grid, n_iter)
+    return grid
+
+
+def time_series_folds(rows: int, n_folds: int) -> List[Tuple[int, int]]:
+    """
+    Expanding-window splits of a time-ordered window cut into n_folds + 1 blocks: fold k fits rows
+    [0, train_stop) and is validated on the next block [train_stop, valid_stop), never on the past.
+    """
+    block = rows // (n_folds + 1)
+    if block < MIN_FOLD_ROWS:
+        raise ValueError(f"The training window has {rows} rows, too few for {n_folds} folds of at least {MIN_FOLD_ROWS} rows.")
+    return [(block * (k + 1), block * (k + 2) if k < n_folds - 1 else rows) for k in range(n_folds)]
+
+
+class SharedWindow(NamedTuple):
+    """Rows [start, stop) of the .npy features/labels every worker maps read-only."""
+    features_path: str
+    labels_path: str
+    start: int
+    stop: int
+
+    def load(self):
+        rows = slice(self.start, self.stop)
+        return np.load(self.features_path, mmap_mode="r")[rows], np.load(self.labels_path, mmap_mode="r")[rows]
+
+
+def share_training_window(parquet_path: str, feature_cols: List[str], train_start, train_end, scratch_dir: str) -> SharedWindow:
+    """
+    The training window as a SharedWindow: a row span of the feature cache when it holds these columns,
+    otherwise decoded from Parquet batch by batch into .npy files under `scratch_dir`.
+    """
+    cache = load_feature_cache(parquet_path)
+    if cache is not None and cache.columns == feature_cols:
+        rows = cache.rows_for_range(train_start, train_end)
+        return SharedWindow(os.path.join(cache.path, FEATURES_FILE), os.path.join(cache.path, LABELS_FILE), rows.start, rows.stop)
+
+    num_rows = read_range(parquet_path, train_start, train_end, columns=["Response"]).num_rows
+    window = SharedWindow(os.path.join(scratch_dir, FEATURES_FILE), os.path.join(scratch_dir, LABELS_FILE), 0, num_rows)
+    features = np.lib.format.open_memmap(window.features_path, mode="w+", dtype=np.float32, shape=(num_rows, len(feature_cols)))
+    labels = np.lib.format.open_memmap(window.labels_path, mode="w+", dtype=np.int8, shape=(num_rows,))
+    offset = 0
+    for batch in iter_range_batches(parquet_path, train_start, train_end, columns=feature_cols + ["Response"], batch_size=batch_rows_for(len(feature_cols))):
+        features[offset:offset + batch.num_rows] = table_to_matrix(batch, feature_cols, np.nan)
+        labels[offset:offset + batch.num_rows] = batch_labels(batch)
+        offset += batch.num_rows
+    features.flush(); labels.flush()
+    return window
+
+
+_fold_matrices = {}  # per search worker: the last fold's matrices, reused by the next candidate fitted on it
+
+
+def _fold_dmatrices(window: SharedWindow, feature_cols: List[str], fold: Tuple[int, int], threads: int):
+    """(dtrain, dvalid, scale_pos_weight) of a fold. Quantizing does not depend on the candidate, so it is done once per fold and worker."""
+    key = (window, fold)
+    if key not in _fold_matrices:
+        _fold_matrices.clear()
+        features, labels = window.load()
+        train_stop, valid_stop = fold
+        _, scale_pos_weight = scale_pos_weight_for(train_stop, int(np.count_nonzero(labels[:train_stop])))
+        dtrain = xgb.QuantileDMatrix(ArrayBatchIter(features[:train_stop], labels[:train_stop], feature_cols), max_bin=MAX_BIN, nthread=threads)
+        # A plain DMatrix: scoring raw values each round is much cheaper than through the quantized matrix
+        dvalid = xgb.DMatrix(features[train_stop:valid_stop], label=labels[train_stop:valid_stop], feature_names=feature_cols, nthread=threads)
+        _fold_matrices[key] = (dtrain, dvalid, scale_pos_weight)
+    return _fold_matrices[key]
+
+
+def _fit_fold(window: SharedWindow, feature_cols: List[str], params: dict, fold: Tuple[int, int],
+              max_rounds: int, early_stopping_rounds: int, threads: int) -> dict:
+    """Runs in a search worker: fits one candidate on one fold and returns its best validation score."""
+    started = time.perf_counter()
+    dtrain, dvalid, scale_pos_weight = _fold_dmatrices(window, feature_cols, fold, threads)
+    booster = xgb.train(dict(params, objective="binary:logistic", eval_metric=SEARCH_METRIC, tree_method="hist", max_bin=MAX_BIN,
+                             seed=42, nthread=threads, scale_pos_weight=scale_pos_weight),
+                        dtrain, num_boost_round=max_rounds, evals=[(dvalid, "valid")], early_stopping_rounds=early_stopping_rounds, verbose_eval=False)
+    return {"score": float(booster.best_score), "best_iteration": int(booster.best_iteration), "seconds": time.perf_counter() - started}
+
+
+def _summarize(params: dict, fold_results: List[dict]) -> dict:
+    scores = [r["score"] for r in fold_results]
+    return {"params": params, "mean_score": float(np.mean(scores)), "std_score": float(np.std(scores)), "fold_scores": scores,
+            "best_iteration": int(round(np.mean([r["best_iteration"] for r in fold_results])))}
+
+
+def search_hyperparameters(train_start: str, train_end: str, test_start: str, test_end: str, model_dir: str, progress=None,
+                           space: Optional[Dict[str, list]] = None, strategy: str = "grid", n_iter: int = 10, n_folds: int = 3,
+                           max_rounds: int = 500, early_stopping_rounds: int = 20, workers: int = SEARCH_WORKERS, **train_kwargs) -> dict:
+    """
+    Evaluates the candidates of `space` on `n_folds` time-ordered folds of the training window in `workers`
+    processes, then trains the best one on the whole window (with the mean early-stopped round count) and
+    saves it to `model_dir` through train_model_on_range. Folds are class-weighted like the out-of-core
+    modes, and so is the final fit: "in_memory" (SMOTE) would refit the winner on a different class balance
+    than it was chosen on, so it becomes "streaming". `train_kwargs` (training_mode, threshold_objective, ...)
+    apply to the final fit. Returns its metrics with the search summary under "search".
+    """
+    # Imported here: the trainer pulls in the app (and SMOTE), which the spawned search workers never need
+    from .model_trainer import DEFAULT_HYPERPARAMETERS, PROCESSED_DATA_PATH, train_model_on_range
+
+    check_search(space, strategy, n_iter, n_folds, max_rounds, early_stopping_rounds)
+    if not os.path.exists(PROCESSED_DATA_PATH):
+        raise FileNotFoundError("Parquet dataset not found. Please upload a dataset first.")
+    started = time.perf_counter()
+    candidates = candidate_params(space or DEFAULT_SEARCH_SPACE, strategy, n_iter)
+    cache = load_feature_cache(PROCESSED_DATA_PATH)
+    # The columns train_model_on_range will pick, so the tuned settings fit the final model's inputs
+    feature_cols = cache.columns if cache is not None else training_feature_columns(PROCESSED_DATA_PATH, pq.read_schema(PROCESSED_DATA_PATH))
+    if not feature_cols:
+        raise ValueError("No numeric feature columns found for training.")
+    if progress is not None:
+        progress.update(stage="loading data", trials_done=0, total_trials=None)
+
+    scratch_dir = tempfile.mkdtemp(prefix="search_", dir=os.path.dirname(PROCESSED_DATA_PATH))
+    try:
+        window = share_training_window(PROCESSED_DATA_PATH, feature_cols, train_start, train_end, scratch_dir)
+        folds = time_series_folds(window.stop - window.start, n_folds)
+        # Fold-major, so a worker's consecutive fits mostly share a fold and its quantized matrix
+        tasks = [(i, k) for k in range(len(folds)) for i in range(len(candidates))]
+        workers = max(1, min(workers, len(tasks)))
+        threads = max(1, (os.cpu_count() or 1) // workers)  # cores split between workers, not oversubscribed
+        if progress is not None:
+            progress.update(stage="searching", total_trials=len(tasks))
+        print(f"Hyperparameter search: {len(candidates)} candidates x {len(folds)} folds on {window.stop - window.start} rows, {workers} workers")
+
+        results = [[None] * len(folds) for _ in candidates]
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {pool.submit(_fit_fold, window, feature_cols, dict(DEFAULT_HYPERPARAMETERS, **candidates[i]), folds[k],
+                                   max_rounds, early_stopping_rounds, threads): (i, k) for i, k in tasks}
+            for done, future in enumerate(as_completed(futures), 1):
+                i, k = futures[future]
+                results[i][k] = future.result()
+                if progress is not None:
+                    progress["trials_done"] = done
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    trials = sorted((_summarize(params, fold_results) for params, fold_results in zip(candidates, results)), key=lambda t: t["mean_score"])
+    best = trials[0]
+    search = {"strategy": strategy, "metric": SEARCH_METRIC, "folds": len(folds), "workers": workers, "best_params": best["params"],
+              "num_rounds": best["best_iteration"] + 1, "search_seconds": round(time.perf_counter() - started, 3), "trials": trials}
+    print(f"Best candidate {best['params']}: {SEARCH_METRIC}={best['mean_score']:.4f}, {search['num_rounds']} rounds")
+
+    if train_kwargs.get("training_mode", "in_memory") == "in_memory":
+        train_kwargs["training_mode"] = "streaming"
+    metrics = train_model_on_range(train_start, train_end, test_start, test_end, model_dir, progress=progress,
+                                   hyperparameters=best["params"], num_rounds=search["num_rounds"], search=search, **train_kwargs)
+    return dict(metrics, search=search)
@@ -0,0 +1,98 @@
+# ===================================================================
+# FILE: backend/ml_service/app/serve.py
+# Pre-forking server for prediction traffic. `uvicorn --workers N` starts
+# N fresh interpreters that each import the stack (about 2 s: xgboost
+# alone pulls in sklearn, scipy, pandas and pyarrow) and load the active
+# model. Here the parent does both once, binds the socket, moves its heap
+# out of the garbage collector's reach (gc.freeze) and forks the workers:
+# they serve within milliseconds and share the imported modules and the
+# booster pages copy-on-write.
+#
+#   python -m app.serve --host 0.0.0.0 --port 8000 --workers 4   (or ML_WORKERS=4)
+#
+# The parent never scores a row: OpenMP's thread pool (used by XGBoost)
+# does not survive a fork, so it must first be started in the workers.
+# Training jobs are published under model/jobs/ so any worker answers
+# for any job, and run within TRAINING_WORKERS at a time across workers
+# (TrainingJobManager.share_state); model activations reach all workers
+# through the registry's on-disk active pointer (ModelRegistry.active).
+# /metrics counters and drift histograms stay per worker.
+# ===================================================================
+
+import argparse
+import gc
+import os
+import signal
+import time
+import traceback
+
+import uvicorn
+
+ML_WORKERS = int(os.getenv("ML_WORKERS", "1"))
+RESTART_DELAY_SECONDS = 1.0  # before replacing a worker that died, so a crash loop does not spin
+
+
+def fork_worker(config: uvicorn.Config, sock) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            # Default handlers until uvicorn installs its own; it re-raises the signal when it is done shutting down
+            signal.signal(signal.SIGTERM, signal.SIG_DFL); signal.signal(signal.SIGINT, signal.SIG_DFL)
+            uvicorn.Server(config).run(sockets=[sock])
+        except BaseException:
+            traceback.print_exc(); code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def supervise(config: uvicorn.Config, sock, workers: int):
+    """Forks `workers` servers on the shared socket and replaces any that die, until SIGTERM/SIGINT (forwarded to them)."""
+    pids, stopping = set(), False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in pids:
+            try: os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError: pass
+
+    signal.signal(signal.SIGTERM, stop); signal.signal(signal.SIGINT, stop)
+    pids.update(fork_worker(config, sock) for _ in range(workers))
+    print(f"✅ Forked {workers} prediction workers: {sorted(pids)}")
+    while pids:
+        pid, status = os.wait()
+        pids.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited ({status}); restarting it")
+            time.sleep(RESTART_DELAY_SECONDS)
+            if not stopping: pids.add(fork_worker(config, sock))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the ML service from one preloaded parent and forked workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=ML_WORKERS)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    from . import main as service
+
+    config = uvicorn.Config(service.app, host=args.host, port=args.port, log_level=args.log_level)
+    sock = config.bind_socket()
+    service.load_prediction_model()
+    service.model_preloaded = True  # the (each forked worker's) startup event then skips the reload
+    if args.workers <= 1:
+        uvicorn.Server(config).run(sockets=[sock])
+        return
+    service.training_jobs.share_state(os.path.join(service.MODEL_DIR, "jobs"))
+    # Objects that survive to here are never collected; freezing them keeps the collector's
+    # traversals from writing to (and so un-sharing) the pages the workers inherit.
+    gc.collect(); gc.freeze()
+    supervise(config, sock, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# ===================================================================
+# FILE: backend/ml_service/benchmarks/_common.py
+# Shared helpers for the benchmark scripts. Run the scripts from
+# backend/ml_service, e.g. `python -m benchmarks.bench_predict_batch`.
+# ===================================================================
+
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ML_SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DATASET_PATH = os.path.join(ML_SERVICE_DIR, "..", "final.csv")
+
+
+@contextmanager
+def scratch_workdir():
+    """The service uses relative data/ and model/ paths, so every benchmark runs in its own temp dir."""
+    previous, workdir = os.getcwd(), tempfile.mkdtemp(prefix="ml_bench_")
+    os.chdir(workdir)
+    try:
+        yield workdir
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+@contextmanager
+def service_client():
+    """Starts the FastAPI app in-process (startup events included) inside a scratch working directory."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with scratch_workdir():
+        with TestClient(app) as client:
+            yield client
+
+
+def upload_and_train(client, dataset_path: str = SAMPLE_DATASET_PATH, train_fraction: float = 0.6, test_fraction: float = 0.2) -> dict:
+    """Uploads a CSV and trains a model on the leading part of it. Returns the upload response."""
+    with open(dataset_path, "rb") as f:
+        upload = client.post("/upload-dataset/", files={"file": (os.path.basename(dataset_path), f, "text/csv")})
+    upload.raise_for_status()
+    info = upload.json()
+    train = client.post("/train-model", json=training_windows(info, train_fraction, test_fraction))
+    train.raise_for_status()
+    return info
+
+
+def training_windows(info: dict, train_fraction: float = 0.6, test_fraction: float = 0.2) -> dict:
+    """A /train-model request body covering the leading fractions of an uploaded dataset."""
+    start, total = pd.Timestamp(info["dateRangeStart"]), info["totalRecords"]
+    train_end = start + pd.Timedelta(seconds=int(total * train_fraction) - 1)
+    test_end = train_end + pd.Timedelta(seconds=int(total * test_fraction))
+    return {
+        "trainStart": start.isoformat(), "trainEnd": train_end.isoformat(),
+        "testStart": (train_end + pd.Timedelta(seconds=1)).isoformat(), "testEnd": test_end.isoformat(),
+    }
+
+
+def write_synthetic_csv(path: str, rows: int, features: int = 5, fail_rate: float = 0.1, chunk_rows: int = 250_000, seed: int = 42,
+                        signal: float = 0.0) -> str:
+    """
+    Writes a Sample_ID/sensor/Response CSV chunk by chunk, so arbitrarily large files fit in memory.
+    With `signal` > 0, failures become more likely as Sensor_0 grows, so models have something to learn.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        values = rng.normal(0, 1, (n, features))
+        chunk = pd.DataFrame(values.round(4), columns=[f"Sensor_{i}" for i in range(features)])
+        chunk.insert(0, "Sample_ID", np.arange(start + 1, start + n + 1))
+        fail_odds = fail_rate / (1 - fail_rate) * np.exp(signal * values[:, 0])
+        chunk["Response"] = (rng.random(n) >= fail_odds / (1 + fail_odds)).astype(int)
+        chunk.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    return path
+
+
+def legacy_csv_to_parquet(csv_path: str, parquet_path: str):
+    """The original upload loop (whole file in memory, 100k-row pandas chunks), kept as a baseline."""
+    with open(csv_path, "rb") as f:
+        body = f.read()
+    with open(parquet_path + ".csv", "wb") as f:
+        f.write(body)
+    writer, total = None, 0
+    for chunk_df in pd.read_csv(parquet_path + ".csv", chunksize=100000):
+        chunk_df["Response"] = chunk_df["Response"].astype(str).str.strip().str.lower().replace({"1": "pass", "0": "fail", "p": "pass", "f": "fail"})
+        chunk_df = chunk_df[chunk_df["Response"].isin(["pass", "fail"])].copy()
+        chunk_df["synthetic_timestamp"] = pd.to_datetime("2025-08-01 00:00:00") + pd.to_timedelta(range(total, total + len(chunk_df)), unit="s")
+        total += len(chunk_df)
+        table = pa.Table.from_pandas(chunk_df, preserve_index=False)
+        writer = writer or pq.ParquetWriter(parquet_path, table.schema)
+        writer.write_table(table)
+    writer.close()
+    os.remove(parquet_path + ".csv")
+
+
+class Stopwatch:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,120 @@
+"""
+Cold start of the service with N workers: `uvicorn app.main:app --workers N`, where every worker imports
+the stack and loads the model itself, against `python -m app.serve --workers N`, one preloaded parent
+forking its workers. For each it reports the time from launch to the first successful /predict, the time
+until the whole process tree goes idle (every worker ready) with the CPU it spent getting there, and,
+after some traffic, the memory of each worker: RSS counts shared pages in full, PSS splits them between
+the processes that map them (the per-worker share of the real footprint), USS is what a worker holds alone.
+
+    python -m benchmarks.bench_cold_start --features 1000 --workers 1 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import psutil
+
+from ._common import ML_SERVICE_DIR, Stopwatch, scratch_workdir, upload_and_train, write_synthetic_csv
+
+MODES = ("uvicorn", "serve")
+IDLE_CPU_SECONDS = 0.05  # tree CPU per 0.5 s poll below which startup counts as finished
+
+
+def server_command(mode: str, port: int, workers: int) -> list:
+    address = ["--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    if mode == "uvicorn":
+        return [sys.executable, "-m", "uvicorn", "app.main:app", *address] + (["--workers", str(workers)] if workers > 1 else [])
+    return [sys.executable, "-m", "app.serve", *address, "--workers", str(workers)]
+
+
+def tree_cpu_seconds(process: psutil.Process) -> float:
+    total = 0.0
+    for p in [process] + process.children(recursive=True):
+        try:
+            times = p.cpu_times()
+            total += times.user + times.system
+        except psutil.Error: pass
+    return total
+
+
+def worker_processes(process: psutil.Process) -> list:
+    children = [p for p in process.children() if "resource_tracker" not in " ".join(p.cmdline())]
+    return children or [process]
+
+
+def measure(mode: str, workers: int, workdir: str, row: dict, warm_requests: int, port: int) -> dict:
+    url = f"http://127.0.0.1:{port}"
+    log = open(os.path.join(workdir, f"{mode}_{workers}.log"), "w")
+    start = time.perf_counter()
+    server = subprocess.Popen(server_command(mode, port, workers), cwd=workdir, env=dict(os.environ, PYTHONPATH=ML_SERVICE_DIR),
+                              stdout=log, stderr=subprocess.STDOUT)
+    process = psutil.Process(server.pid)
+    try:
+        while True:
+            if server.poll() is not None or time.perf_counter() - start > 300:
+                raise RuntimeError(f"{mode} did not serve, see {log.name}")
+            try:
+                if httpx.post(f"{url}/predict", json=row).status_code == 200: break
+            except httpx.TransportError: pass
+            time.sleep(0.02)
+        first_prediction = time.perf_counter() - start
+        previous = tree_cpu_seconds(process)
+        while True:
+            time.sleep(0.5)
+            current = tree_cpu_seconds(process)
+            if current - previous < IDLE_CPU_SECONDS: break
+            previous = current
+        ready, startup_cpu = time.perf_counter() - start - 0.5, current
+
+        for _ in range(warm_requests):  # a new connection each, so the kernel spreads them over the workers
+            httpx.post(f"{url}/predict", json=row).raise_for_status()
+        memory = [p.memory_full_info() for p in worker_processes(process)]
+        mb = lambda values: round(sum(values) / len(values) / 2**20, 1)
+        return {"mode": mode, "workers": workers, "first_prediction_seconds": round(first_prediction, 2), "all_ready_seconds": round(ready, 2),
+                "startup_cpu_seconds": round(startup_cpu, 2), "worker_rss_mb": mb([m.rss for m in memory]), "worker_pss_mb": mb([m.pss for m in memory]),
+                "worker_uss_mb": mb([m.uss for m in memory]), "parent_rss_mb": round(process.memory_info().rss / 2**20, 1) if workers > 1 else None}
+    finally:
+        server.terminate()
+        try: server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            for p in process.children(recursive=True): p.kill()
+            server.kill()
+        log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--features", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--warm-requests", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    results = []
+    with scratch_workdir() as workdir:
+        write_synthetic_csv("upload.csv", args.rows, args.features, signal=1.5)
+        with Stopwatch() as sw, TestClient(app) as client:
+            upload_and_train(client, "upload.csv")
+        os.remove("upload.csv")
+        print(f"Trained a {args.features}-feature model in {sw.elapsed:.1f}s")
+        row = {f"Sensor_{i}": 0.1 * i for i in range(args.features)}
+        for workers in args.workers:
+            for mode in args.modes:
+                result = measure(mode, workers, workdir, row, args.warm_requests, args.port)
+                print(json.dumps(result))
+                results.append(result)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
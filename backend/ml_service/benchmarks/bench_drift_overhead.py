@@ -0,0 +1,75 @@
+"""
+Cost of drift monitoring on the scoring path: per batch, the time of InferenceEngine.predict_matrix and
+of DriftMonitor.observe at several DRIFT_SAMPLE_RATE values (overhead = observe / predict), and the
+latency of report(), which should not grow with the number of rows observed. Both are timed separately,
+best of --repeats, because end-to-end throughput differences of a few percent drown in the noise of a
+shared machine.
+
+    python -m benchmarks.bench_drift_overhead --features 50 1000 --batch-rows 1 1000
+"""
+
+import argparse
+import json
+
+import numpy as np
+import xgboost as xgb
+
+from ._common import Stopwatch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--features", type=int, nargs="+", default=[50, 1000])
+    parser.add_argument("--batch-rows", type=int, nargs="+", default=[1, 1000])
+    parser.add_argument("--rows", type=int, default=50_000, help="rows scored per measurement")
+    parser.add_argument("--sample-rates", type=float, nargs="+", default=[0.01, 0.05, 0.2, 1.0])
+    parser.add_argument("--missing-rate", type=float, default=0.8)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.ml.drift import DriftMonitor, build_reference
+    from app.ml.predictor import InferenceEngine
+
+    rng = np.random.default_rng(0)
+    results = []
+    for features in args.features:
+        X = rng.normal(0, 1, (20_000, features)).astype(np.float32)
+        X[rng.random(X.shape) < args.missing_rate] = np.nan
+        y = (np.nan_to_num(X[:, 0]) + rng.normal(0, 1, len(X)) > 0).astype(int)
+        columns = [f"f{j}" for j in range(features)]
+        booster = xgb.train({"objective": "binary:logistic", "max_depth": 5, "tree_method": "hist"}, xgb.DMatrix(X, label=y, feature_names=columns), 150)
+        engine = InferenceEngine(booster, columns, np.nan)
+        with Stopwatch() as sw:
+            reference = build_reference(X, columns, engine.predict_matrix(X))
+        entry = {"features": features, "build_reference_seconds": round(sw.elapsed, 3), "batches": []}
+
+        for batch_rows in args.batch_rows:
+            batches = [X[i % len(X):i % len(X) + batch_rows] for i in range(0, args.rows, batch_rows)]
+            scored = [(b, engine.predict_matrix(b)) for b in batches]
+            best = lambda run, calls: min(_timed(run, calls) for _ in range(args.repeats)) / len(calls) * 1000
+            predict_ms = best(engine.predict_matrix, [(b,) for b in batches])
+            batch = {"batch_rows": batch_rows, "predict_ms": round(predict_ms, 3), "observe_ms": {}, "overhead_pct": {}}
+            for rate in args.sample_rates:
+                monitor = DriftMonitor(reference, sample_rate=rate)
+                observe_ms = best(monitor.observe, scored)
+                batch["observe_ms"][str(rate)] = round(observe_ms, 3)
+                batch["overhead_pct"][str(rate)] = round(100 * observe_ms / predict_ms, 1)
+            entry["batches"].append(batch)
+        with Stopwatch() as sw:
+            for _ in range(20):
+                monitor.report()
+        entry["report_ms"] = round(sw.elapsed / 20 * 1000, 2)
+        print(json.dumps(entry))
+        results.append(entry)
+    print(json.dumps(results, indent=2))
+
+
+def _timed(run, calls) -> float:
+    with Stopwatch() as sw:
+        for call in calls:
+            run(*call)
+    return sw.elapsed
+
+
+if __name__ == "__main__":
+    main()
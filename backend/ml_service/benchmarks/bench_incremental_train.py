@@ -0,0 +1,61 @@
+"""
+Retrain cost as history grows: a full retrain on everything up to the new end date against a warm start
+(incremental=True) that continues the previous model on only the newly added rows.
+
+For each history size H the dataset holds H + --new-rows + --test-rows rows. A base model is trained on
+the first H rows; the new rows are then learned either from scratch (full) or incrementally, and both
+are evaluated on the same trailing test window.
+
+    python -m benchmarks.bench_incremental_train --history 50000 200000 800000 --new-rows 10000
+"""
+
+import argparse
+import json
+import os
+
+import pandas as pd
+
+from ._common import Stopwatch, scratch_workdir, write_synthetic_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, nargs="+", default=[50_000, 200_000, 800_000])
+    parser.add_argument("--new-rows", type=int, default=10_000)
+    parser.add_argument("--test-rows", type=int, default=20_000)
+    parser.add_argument("--features", type=int, default=50)
+    parser.add_argument("--training-mode", default="streaming", help="mode of the base and full runs")
+    args = parser.parse_args()
+
+    from app.ml.feature_cache import build_feature_cache
+    from app.ml.ingest import convert_csv_to_parquet
+    from app.ml.model_trainer import train_model_on_range
+
+    results = []
+    with scratch_workdir():
+        os.makedirs("data", exist_ok=True)
+        for history in args.history:
+            rows = history + args.new_rows + args.test_rows
+            write_synthetic_csv("upload.csv", rows, args.features, signal=1.5)
+            with open("upload.csv", "rb") as f:
+                start = convert_csv_to_parquet(f, os.path.join("data", "processed_dataset.parquet"))["date_range_start"]
+            os.remove("upload.csv")
+            build_feature_cache(os.path.join("data", "processed_dataset.parquet"))
+            at = lambda row: (start + pd.Timedelta(seconds=row)).isoformat()
+            test = dict(test_start=at(history + args.new_rows), test_end=at(rows - 1))
+
+            base_dir = os.path.join("model", "registry", f"base_{history}")
+            train_model_on_range(at(0), at(history - 1), **test, model_dir=base_dir, training_mode=args.training_mode)
+            entry = {"history_rows": history, "new_rows": args.new_rows}
+            for name, extra in (("full", {}), ("incremental", {"base_model_dir": base_dir})):
+                with Stopwatch() as sw:
+                    metrics = train_model_on_range(at(0), at(history + args.new_rows - 1), **test, model_dir=os.path.join("model", "registry", f"{name}_{history}"),
+                                                   training_mode=args.training_mode, **extra)
+                entry[name] = {"seconds": round(sw.elapsed, 2), "f1_score": round(metrics["f1_score"], 2), "roc_auc": round(metrics["roc_auc"], 2)}
+            print(json.dumps(entry))
+            results.append(entry)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Peak RSS of CSV->Parquet ingestion as the uploaded file grows. Each measurement runs in a fresh
+subprocess so ru_maxrss reflects that conversion alone. `--legacy` also measures the previous
+read-everything + pandas chunk loop for comparison.
+
+    python -m benchmarks.bench_ingest_memory --rows 500000 1000000 2500000 5000000 --legacy
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from ._common import ML_SERVICE_DIR, Stopwatch, scratch_workdir, write_synthetic_csv
+
+STREAMING = """
+import sys
+from app.ml.ingest import convert_csv_to_parquet
+with open(sys.argv[1], "rb") as f:
+    convert_csv_to_parquet(f, sys.argv[2])
+"""
+
+LEGACY = """
+import sys
+from benchmarks._common import legacy_csv_to_parquet
+legacy_csv_to_parquet(sys.argv[1], sys.argv[2])
+"""
+
+MEASURE = """
+import resource, sys
+code = sys.argv.pop(1)
+exec(compile(code, "<ingest>", "exec"))
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def peak_rss_mb(code: str, csv_path: str, out_path: str) -> float:
+    env = dict(os.environ, PYTHONPATH=ML_SERVICE_DIR)
+    result = subprocess.run([sys.executable, "-c", MEASURE, code, csv_path, out_path], env=env, capture_output=True, text=True, check=True)
+    return int(result.stdout.strip().splitlines()[-1]) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[500_000, 1_000_000, 2_500_000, 5_000_000])
+    parser.add_argument("--features", type=int, default=5)
+    parser.add_argument("--legacy", action="store_true", help="also measure the previous ingestion path")
+    args = parser.parse_args()
+
+    results = []
+    with scratch_workdir() as workdir:
+        csv_path, out_path = os.path.join(workdir, "upload.csv"), os.path.join(workdir, "out.parquet")
+        for rows in args.rows:
+            write_synthetic_csv(csv_path, rows, args.features)
+            entry = {"rows": rows, "csv_mb": round(os.path.getsize(csv_path) / 2**20, 1)}
+            with Stopwatch() as sw:
+                entry["streaming_peak_rss_mb"] = round(peak_rss_mb(STREAMING, csv_path, out_path), 1)
+            entry["streaming_seconds"] = round(sw.elapsed, 2)
+            if args.legacy:
+                with Stopwatch() as sw:
+                    entry["legacy_peak_rss_mb"] = round(peak_rss_mb(LEGACY, csv_path, out_path), 1)
+                entry["legacy_seconds"] = round(sw.elapsed, 2)
+            print(json.dumps(entry))
+            results.append(entry)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
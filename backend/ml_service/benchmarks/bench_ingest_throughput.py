@@ -0,0 +1,65 @@
+"""
+CSV->Parquet ingest throughput (MB/s of CSV) for the pipelined converter at different Arrow CPU
+thread counts, against the same converter with its stages run inline on one thread and,
+optionally, the previous pandas chunk loop.
+
+    python -m benchmarks.bench_ingest_throughput --rows 2000000 --features 20 --threads 1 2 4 8 --legacy
+"""
+
+import argparse
+import json
+import os
+
+import pyarrow as pa
+
+from app.ml.ingest import convert_csv_to_parquet
+
+from ._common import Stopwatch, legacy_csv_to_parquet, scratch_workdir, write_synthetic_csv
+
+
+def throughput(convert, csv_path: str, repeats: int) -> dict:
+    best = float("inf")
+    for _ in range(repeats):
+        with Stopwatch() as sw:
+            convert()
+        best = min(best, sw.elapsed)
+    return {"seconds": round(best, 2), "mb_per_s": round(os.path.getsize(csv_path) / 2**20 / best, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--features", type=int, default=20)
+    parser.add_argument("--threads", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--legacy", action="store_true", help="also measure the previous pandas chunk loop")
+    args = parser.parse_args()
+
+    default_threads = pa.cpu_count()
+    results = {"rows": args.rows, "features": args.features, "cpu_count": os.cpu_count(), "runs": []}
+    with scratch_workdir():
+        write_synthetic_csv("upload.csv", args.rows, args.features)
+        results["csv_mb"] = round(os.path.getsize("upload.csv") / 2**20, 1)
+
+        def pipelined(depth):
+            def convert():
+                with open("upload.csv", "rb") as f:
+                    convert_csv_to_parquet(f, "out.parquet", pipeline_depth=depth)
+            return convert
+
+        try:
+            pa.set_cpu_count(1)
+            results["runs"].append(dict(mode="inline", threads=1, **throughput(pipelined(0), "upload.csv", args.repeats)))
+            for threads in args.threads:
+                pa.set_cpu_count(threads)
+                results["runs"].append(dict(mode="pipelined", threads=threads, **throughput(pipelined(4), "upload.csv", args.repeats)))
+        finally:
+            pa.set_cpu_count(default_threads)
+        if args.legacy:
+            legacy = lambda: legacy_csv_to_parquet("upload.csv", "legacy.parquet")
+            results["runs"].append(dict(mode="legacy_pandas", threads=1, **throughput(legacy, "upload.csv", 1)))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Compares rows/sec of the single-row /predict path against /predict-batch (JSON and Arrow IPC).
+
+    python -m benchmarks.bench_predict_batch --rows 5000
+"""
+
+import argparse
+import json
+
+import pandas as pd
+import pyarrow as pa
+
+from ._common import SAMPLE_DATASET_PATH, Stopwatch, service_client, upload_and_train
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000, help="rows scored by each batch request")
+    parser.add_argument("--single-rows", type=int, default=500, help="rows sent one by one through /predict")
+    args = parser.parse_args()
+
+    sample = pd.read_csv(SAMPLE_DATASET_PATH).drop(columns=["Sample_ID", "Response"])
+    rows = pd.concat([sample] * (args.rows // len(sample) + 1), ignore_index=True).head(args.rows)
+    records = rows.to_dict(orient="records")
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(rows, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    arrow_body = sink.getvalue().to_pybytes()
+
+    with service_client() as client:
+        upload_and_train(client)
+
+        with Stopwatch() as single:
+            single_results = [client.post("/predict", json=r).json() for r in records[:args.single_rows]]
+        with Stopwatch() as batch_json:
+            json_results = client.post("/predict-batch", json=records).json()
+        with Stopwatch() as batch_arrow:
+            arrow_results = client.post("/predict-batch", content=arrow_body, headers={"Content-Type": "application/vnd.apache.arrow.stream"}).json()
+
+    assert json_results[:args.single_rows] == single_results, "batch results diverge from /predict"
+    assert arrow_results == json_results, "Arrow and JSON batch results diverge"
+    results = {
+        "single_rows_per_sec": args.single_rows / single.elapsed,
+        "batch_json_rows_per_sec": args.rows / batch_json.elapsed,
+        "batch_arrow_rows_per_sec": args.rows / batch_arrow.elapsed,
+    }
+    results["speedup_json"] = results["batch_json_rows_per_sec"] / results["single_rows_per_sec"]
+    results["speedup_arrow"] = results["batch_arrow_rows_per_sec"] / results["single_rows_per_sec"]
+    print(json.dumps({k: round(v, 1) for k, v in results.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Single-row prediction latency (p50/p99): the previous pandas reindex + predict_proba path against
+the model's precompiled InferenceEngine, in-process, plus the /predict endpoint end to end.
+
+    python -m benchmarks.bench_predict_latency --features 5 200
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import app.main as service
+
+from ._common import Stopwatch, service_client, upload_and_train, write_synthetic_csv
+
+
+def percentiles(fn, payloads, repeats: int) -> dict:
+    timings = []
+    for i in range(repeats):
+        payload = payloads[i % len(payloads)]
+        with Stopwatch() as sw:
+            fn(payload)
+        timings.append(sw.elapsed * 1e6)
+    return {"p50_us": round(float(np.percentile(timings, 50)), 1), "p99_us": round(float(np.percentile(timings, 99)), 1)}
+
+
+def legacy_predict(entry):
+    def predict(data):
+        input_df = pd.DataFrame([data]).reindex(columns=entry.columns).fillna(0)
+        return entry.model.predict_proba(input_df)[0][1]
+    return predict
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--features", type=int, nargs="+", default=[5, 200])
+    parser.add_argument("--rows", type=int, default=5000, help="rows in the training dataset")
+    parser.add_argument("--repeats", type=int, default=3000)
+    args = parser.parse_args()
+
+    results = []
+    for features in args.features:
+        with service_client() as client:
+            csv_path = write_synthetic_csv(os.path.abspath("bench.csv"), args.rows, features)
+            upload_and_train(client, csv_path)
+            entry = service.model_registry.active
+            payloads = pd.read_csv(csv_path, nrows=200).drop(columns=["Sample_ID", "Response"]).to_dict(orient="records")
+            for payload in payloads:
+                assert abs(legacy_predict(entry)(payload) - entry.engine.predict_row(payload)) < 1e-6
+            results.append({
+                "features": features,
+                "legacy_inprocess": percentiles(legacy_predict(entry), payloads, args.repeats),
+                "engine_inprocess": percentiles(entry.engine.predict_row, payloads, args.repeats),
+                "endpoint": percentiles(lambda p: client.post("/predict", json=p), payloads, max(200, args.repeats // 5)),
+            })
+            print(json.dumps(results[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
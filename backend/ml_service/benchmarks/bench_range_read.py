@@ -0,0 +1,68 @@
+"""
+Range-read latency against dataset size, for the legacy layout (100k-row pandas chunks read with
+pq.read_table filters) and the indexed layout (fixed row groups + sidecar index via read_range).
+
+    python -m benchmarks.bench_range_read --rows 1000000 5000000
+"""
+
+import argparse
+import json
+import os
+import statistics
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from app.ml.dataset_index import read_range
+from app.ml.ingest import DATASET_START, convert_csv_to_parquet
+
+from ._common import Stopwatch, legacy_csv_to_parquet, scratch_workdir, write_synthetic_csv
+
+RANGES = {"1min": 60, "1h": 3600, "1d": 86400}
+
+
+def median_ms(read, total_rows: int, span: int, repeats: int, rng) -> float:
+    timings = []
+    for _ in range(repeats):
+        offset = int(rng.integers(0, max(1, total_rows - span)))
+        start = DATASET_START + pd.Timedelta(seconds=offset)
+        with Stopwatch() as sw:
+            read(start, start + pd.Timedelta(seconds=span - 1))
+        timings.append(sw.elapsed * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--repeats", type=int, default=15)
+    args = parser.parse_args()
+
+    rng, results = np.random.default_rng(0), []
+    with scratch_workdir() as workdir:
+        csv_path = os.path.join(workdir, "upload.csv")
+        legacy_path, indexed_path = os.path.join(workdir, "legacy.parquet"), os.path.join(workdir, "indexed.parquet")
+        for rows in args.rows:
+            write_synthetic_csv(csv_path, rows)
+            legacy_csv_to_parquet(csv_path, legacy_path)
+            with open(csv_path, "rb") as f:
+                convert_csv_to_parquet(f, indexed_path)
+
+            def legacy_read(start, end):
+                return pq.read_table(legacy_path, filters=[("synthetic_timestamp", ">=", start), ("synthetic_timestamp", "<=", end)])
+
+            def indexed_read(start, end):
+                return read_range(indexed_path, start, end)
+
+            for name, span in RANGES.items():
+                entry = {"rows": rows, "range": name,
+                         "legacy_ms": round(median_ms(legacy_read, rows, span, args.repeats, rng), 2),
+                         "indexed_ms": round(median_ms(indexed_read, rows, span, args.repeats, rng), 2)}
+                print(json.dumps(entry))
+                results.append(entry)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Latency of /get-record-counts-for-ranges. Measures the endpoint in-process on a real upload
+(indexed vs. the legacy Parquet-scanning path), and the index arithmetic on a 100M-row index.
+
+    python -m benchmarks.bench_record_counts --rows 2000000
+"""
+
+import argparse
+import json
+import os
+import statistics
+
+import pandas as pd
+
+import app.main as service
+from app.ml.dataset_index import MAX_ROW_GROUP_ROWS, TIMESTAMP_STEP_NS, count_range, index_bounds
+from app.ml.ingest import DATASET_START
+
+from ._common import Stopwatch, service_client, write_synthetic_csv
+
+
+def period(start_offset: int, length: int) -> dict:
+    start = DATASET_START + pd.Timedelta(seconds=start_offset)
+    return {"startDate": start.isoformat(), "endDate": (start + pd.Timedelta(seconds=length - 1)).isoformat()}
+
+
+def timed_ms(fn, repeats: int) -> dict:
+    timings = []
+    for _ in range(repeats):
+        with Stopwatch() as sw:
+            fn()
+        timings.append(sw.elapsed * 1000)
+    timings.sort()
+    return {"p50_ms": round(statistics.median(timings), 4), "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 4)}
+
+
+def synthetic_index(rows: int) -> dict:
+    """An index shaped exactly like the one ingestion writes for `rows` contiguous rows."""
+    start, groups = DATASET_START.value, []
+    for first_row in range(0, rows, MAX_ROW_GROUP_ROWS):
+        n = min(MAX_ROW_GROUP_ROWS, rows - first_row)
+        groups.append({"first_row": first_row, "num_rows": n, "min": start + first_row * TIMESTAMP_STEP_NS, "max": start + (first_row + n - 1) * TIMESTAMP_STEP_NS})
+    index = {"row_groups": groups, "segments": [{"start": start, "first_row": 0, "num_rows": rows}]}
+    index["_group_max"] = [g["max"] for g in groups]
+    index["_segment_start"] = [start]
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="rows in the uploaded dataset")
+    parser.add_argument("--index-rows", type=int, default=100_000_000, help="rows in the synthetic index")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    third = args.rows // 3
+    body = {"trainingPeriod": period(0, third), "testingPeriod": period(third, third), "simulationPeriod": period(2 * third, third)}
+    results = {"rows": args.rows}
+    with service_client() as client:
+        csv_path = write_synthetic_csv(os.path.abspath("upload.csv"), args.rows)
+        with open(csv_path, "rb") as f:
+            client.post("/upload-dataset/", files={"file": ("upload.csv", f, "text/csv")}).raise_for_status()
+        expected = client.post("/get-record-counts-for-ranges", json=body).json()
+        results["endpoint_indexed"] = timed_ms(lambda: client.post("/get-record-counts-for-ranges", json=body), args.repeats)
+        # Hide the sidecar index to time the legacy scanning path on the same file.
+        original_load_index, service.load_index = service.load_index, lambda path: None
+        try:
+            assert client.post("/get-record-counts-for-ranges", json=body).json() == expected
+            results["endpoint_legacy_scan"] = timed_ms(lambda: client.post("/get-record-counts-for-ranges", json=body), max(5, args.repeats // 20))
+        finally:
+            service.load_index = original_load_index
+
+    index = synthetic_index(args.index_rows)
+    quarter = DATASET_START + pd.Timedelta(seconds=args.index_rows // 4)
+    end = quarter + pd.Timedelta(days=30)
+
+    def counts_on_index():
+        index_bounds(index)
+        for _ in range(3): count_range(index, quarter.isoformat(), end.isoformat())
+
+    results["index_rows"] = args.index_rows
+    results["index_three_counts"] = timed_ms(counts_on_index, args.repeats * 10)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
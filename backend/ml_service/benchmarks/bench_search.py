@@ -0,0 +1,60 @@
+"""
+Wall-clock time of a hyperparameter search as the number of worker processes grows. The same grid is
+cross-validated with each --workers value (speedup relative to the first), reading the training window
+from the feature cache or, with --no-cache, from the copy the search decodes into a scratch memmap.
+Scaling is bounded by the cores available: compare os.cpu_count() in the output.
+
+    python -m benchmarks.bench_search --rows 100000 --features 200 --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+
+import pandas as pd
+
+from ._common import Stopwatch, scratch_workdir, write_synthetic_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--features", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--max-rounds", type=int, default=200)
+    parser.add_argument("--no-cache", action="store_true", help="search without the decoded feature cache")
+    args = parser.parse_args()
+
+    from app.ml.feature_cache import build_feature_cache
+    from app.ml.ingest import convert_csv_to_parquet
+    from app.ml.tuning import search_hyperparameters
+
+    space = {"max_depth": [3, 5, 7], "learning_rate": [0.1, 0.3]}
+    results = {"cpu_count": os.cpu_count(), "rows": args.rows, "features": args.features, "space": space, "runs": []}
+    with scratch_workdir():
+        os.makedirs("data", exist_ok=True)
+        write_synthetic_csv("upload.csv", args.rows, args.features, signal=1.5)
+        with open("upload.csv", "rb") as f:
+            start = convert_csv_to_parquet(f, os.path.join("data", "processed_dataset.parquet"))["date_range_start"]
+        os.remove("upload.csv")
+        if not args.no_cache:
+            build_feature_cache(os.path.join("data", "processed_dataset.parquet"))
+        at = lambda row: (start + pd.Timedelta(seconds=row)).isoformat()
+        window = dict(train_start=at(0), train_end=at(int(args.rows * 0.8) - 1), test_start=at(int(args.rows * 0.8)), test_end=at(args.rows - 1))
+
+        for workers in args.workers:
+            with Stopwatch() as sw:
+                metrics = search_hyperparameters(**window, model_dir=os.path.join("model", "registry", f"search_{workers}"), space=space,
+                                                 n_folds=args.folds, max_rounds=args.max_rounds, workers=workers, training_mode="streaming")
+            search = metrics["search"]
+            run = {"workers": workers, "seconds": round(sw.elapsed, 2), "search_seconds": search["search_seconds"],
+                   "best_params": search["best_params"], "num_rounds": search["num_rounds"], "f1_score": round(metrics["f1_score"], 2)}
+            run["speedup"] = round(results["runs"][0]["search_seconds"] / run["search_seconds"], 2) if results["runs"] else 1.0
+            print(json.dumps(run))
+            results["runs"].append(run)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+End-to-end benchmark suite for the service endpoints. Generates a dataset with data_gen.py (Bosch-line
+widths by default), then drives the app in-process through an ASGI client and/or over HTTP against a
+local uvicorn, measuring:
+
+  upload    /upload-dataset/ throughput (rows/s, MB/s of CSV) and peak RSS
+  counts    /get-record-counts-for-ranges latency (p50/p99)
+  fetch     /get-data-for-range and its NDJSON stream: throughput over a window of --fetch-rows rows
+  train     /train-model wall time and peak RSS of the service process tree (training worker included)
+  predict   /predict latency (p50/p99) and throughput at each --concurrency level
+
+Results are written as JSON; pass a previous result file to --compare to print the relative changes.
+
+    python -m benchmarks.bench_service --rows 20000 --features 1000 --concurrency 1 4 16 --output bench.json
+    python -m benchmarks.bench_service --transports asgi --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import numpy as np
+import pandas as pd
+import psutil
+
+from data_gen import generate_dataset
+
+from ._common import ML_SERVICE_DIR, Stopwatch, scratch_workdir, training_windows
+
+TRANSPORTS = ("asgi", "uvicorn")
+LABEL_COLUMNS = ("Sample_ID", "Response", "synthetic_timestamp")
+
+
+def latency_summary(seconds: list) -> dict:
+    ms = np.asarray(seconds) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 2), "p99_ms": round(float(np.percentile(ms, 99)), 2),
+            "mean_ms": round(float(ms.mean()), 2), "samples": len(ms)}
+
+
+class RssSampler:
+    """Polls the summed RSS of a process and all its descendants, keeping the peak."""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        self.process, self.interval, self.peak = psutil.Process(pid), interval, 0
+        self._stop = threading.Event()
+
+    def _tree_rss(self) -> int:
+        total = 0
+        for process in [self.process] + self.process.children(recursive=True):
+            try: total += process.memory_info().rss
+            except psutil.Error: pass  # exited between listing and sampling
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._tree_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set(); self._thread.join()
+        self.peak = max(self.peak, self._tree_rss())
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak / 2**20, 1)
+
+
+# --- Transports: each yields (client, pid of the service process) inside its own scratch directory ---
+@asynccontextmanager
+async def asgi_service():
+    """The app in this process (lifespan events included); requests go through httpx's ASGI transport."""
+    from app.main import app
+
+    with scratch_workdir():
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver", timeout=None) as client:
+                yield client, os.getpid()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@asynccontextmanager
+async def uvicorn_service(startup_timeout: float = 120):
+    """`uvicorn app.main:app` in a subprocess, reached over loopback HTTP."""
+    with scratch_workdir() as workdir:
+        port, log_path = free_port(), os.path.join(workdir, "uvicorn.log")
+        env = dict(os.environ, PYTHONPATH=ML_SERVICE_DIR)
+        with open(log_path, "w") as log:
+            server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+                                      cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+                deadline = time.monotonic() + startup_timeout
+                while True:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        with open(log_path) as log:
+                            raise RuntimeError(f"uvicorn did not start:\n{log.read()[-2000:]}")
+                    try:
+                        if (await client.get("/health")).status_code == 200: break
+                    except httpx.TransportError:
+                        pass
+                    await asyncio.sleep(0.2)
+                yield client, server.pid
+        finally:
+            server.terminate()
+            try: server.wait(timeout=30)
+            except subprocess.TimeoutExpired: server.kill()
+
+
+# --- Scenarios ---
+async def bench_upload(client, pid: int, csv_path: str) -> tuple:
+    with RssSampler(pid) as rss, open(csv_path, "rb") as f, Stopwatch() as sw:
+        response = await client.post("/upload-dataset/", files={"file": (os.path.basename(csv_path), f, "text/csv")})
+    response.raise_for_status()
+    info = response.json()
+    return info, {"seconds": round(sw.elapsed, 2), "rows_per_s": round(info["totalRecords"] / sw.elapsed),
+                  "mb_per_s": round(os.path.getsize(csv_path) / 2**20 / sw.elapsed, 1), "peak_rss_mb": rss.peak_mb}
+
+
+def window(start: str, end: str) -> dict:
+    return {"startDate": start, "endDate": end}
+
+
+async def bench_counts(client, info: dict, repeats: int) -> dict:
+    w = training_windows(info)
+    body = {"trainingPeriod": window(w["trainStart"], w["trainEnd"]), "testingPeriod": window(w["testStart"], w["testEnd"]),
+            "simulationPeriod": window(w["testEnd"], info["dateRangeEnd"])}
+    timings = []
+    for _ in range(repeats):
+        with Stopwatch() as sw:
+            response = await client.post("/get-record-counts-for-ranges", json=body)
+        response.raise_for_status()
+        timings.append(sw.elapsed)
+    return latency_summary(timings)
+
+
+async def bench_fetch(client, info: dict, rows: int, repeats: int) -> tuple:
+    """Fetches the first `rows` rows (one per second of synthetic time) as a JSON array and as an NDJSON stream."""
+    start = pd.Timestamp(info["dateRangeStart"])
+    body = window(start.isoformat(), (start + pd.Timedelta(seconds=rows - 1)).isoformat())
+    results, payload = {}, None
+    for name, path in (("json", "/get-data-for-range"), ("ndjson_stream", "/get-data-for-range/stream")):
+        timings, size, fetched = [], 0, 0
+        for _ in range(repeats):
+            with Stopwatch() as sw:
+                response = await client.post(path, json=body)
+                response.raise_for_status()
+                content = response.content
+            timings.append(sw.elapsed)
+            size = len(content)
+        if name == "json":
+            payload = response.json()
+            fetched = len(payload)
+        else:
+            fetched = content.count(b"\n")
+        best = min(timings)
+        results[name] = {"rows": fetched, "seconds": round(best, 3), "rows_per_s": round(fetched / best), "mb_per_s": round(size / 2**20 / best, 1)}
+    return payload, results
+
+
+async def bench_train(client, pid: int, info: dict, training_mode: str) -> dict:
+    body = dict(training_windows(info), trainingMode=training_mode)
+    with RssSampler(pid) as rss, Stopwatch() as sw:
+        response = await client.post("/train-model", json=body)
+    response.raise_for_status()
+    metrics = response.json()["metrics"]
+    return {"training_mode": training_mode, "seconds": round(sw.elapsed, 2), "peak_rss_mb": rss.peak_mb,
+            "f1_score": round(metrics["f1Score"], 2), "roc_auc": round(metrics["rocAuc"], 2)}
+
+
+async def bench_predict(client, payloads: list, concurrency: int, requests: int) -> dict:
+    """`concurrency` clients issue back-to-back /predict calls until `requests` have completed."""
+    timings, next_index = [], iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            with Stopwatch() as sw:
+                response = await client.post("/predict", json=payloads[i % len(payloads)])
+            response.raise_for_status()
+            timings.append(sw.elapsed)
+
+    for payload in payloads[:min(20, len(payloads))]:  # warm-up
+        (await client.post("/predict", json=payload)).raise_for_status()
+    with Stopwatch() as sw:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return dict(concurrency=concurrency, requests_per_s=round(requests / sw.elapsed, 1), **latency_summary(timings))
+
+
+async def run_transport(transport: str, csv_path: str, args) -> dict:
+    service = asgi_service() if transport == "asgi" else uvicorn_service()
+    async with service as (client, pid):
+        info, results = await bench_upload(client, pid, csv_path)
+        results = {"upload": results}
+        print(f"[{transport}] upload: {results['upload']}", file=sys.stderr)
+        results["counts"] = await bench_counts(client, info, args.repeats)
+        print(f"[{transport}] counts: {results['counts']}", file=sys.stderr)
+        rows, results["fetch"] = await bench_fetch(client, info, min(args.fetch_rows, info["totalRecords"]), max(1, args.repeats // 20))
+        print(f"[{transport}] fetch: {results['fetch']}", file=sys.stderr)
+        results["train"] = await bench_train(client, pid, info, args.training_mode)
+        print(f"[{transport}] train: {results['train']}", file=sys.stderr)
+        payloads = [{k: v for k, v in row.items() if k not in LABEL_COLUMNS} for row in rows[:500]]
+        results["predict"] = []
+        for concurrency in args.concurrency:
+            results["predict"].append(await bench_predict(client, payloads, concurrency, args.predict_requests))
+            print(f"[{transport}] predict: {results['predict'][-1]}", file=sys.stderr)
+        return results
+
+
+# --- Regression comparison ---
+def numeric_leaves(node, prefix: str = "") -> dict:
+    if isinstance(node, dict):
+        return {k: v for key, value in node.items() for k, v in numeric_leaves(value, f"{prefix}.{key}" if prefix else key).items()}
+    if isinstance(node, list):  # lists of per-concurrency results are keyed by their concurrency level
+        return {k: v for i, value in enumerate(node) for k, v in numeric_leaves(value, f"{prefix}[c={value.get('concurrency', i) if isinstance(value, dict) else i}]").items()}
+    if isinstance(node, (int, float)) and not isinstance(node, bool):
+        return {prefix: node}
+    return {}
+
+
+SETTING_KEYS = ("concurrency", "samples", "rows")  # describe the run rather than measure it
+
+
+def compare(baseline: dict, current: dict):
+    if baseline["environment"].get("dataset") != current["environment"].get("dataset"):
+        print(f"⚠️ Datasets differ: {baseline['environment'].get('dataset')} vs {current['environment'].get('dataset')}")
+    old, new = numeric_leaves(baseline["results"]), numeric_leaves(current["results"])
+    old = {k: v for k, v in old.items() if k.rsplit(".", 1)[-1] not in SETTING_KEYS}
+    print(f"{'metric':<60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key in sorted(old.keys() & new.keys()):
+        change = f"{(new[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else "n/a"
+        print(f"{key:<60} {old[key]:>12} {new[key]:>12} {change:>8}")
+
+
+def environment(args) -> dict:
+    import fastapi, pyarrow, xgboost
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ML_SERVICE_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "git_commit": commit, "python": platform.python_version(),
+            "platform": platform.platform(), "cpu_count": os.cpu_count(), "memory_mb": psutil.virtual_memory().total >> 20,
+            "versions": {"fastapi": fastapi.__version__, "pyarrow": pyarrow.__version__, "xgboost": xgboost.__version__},
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--features", type=int, default=1000)
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="fraction of station values left empty (see data_gen.py)")
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--predict-requests", type=int, default=1000, help="/predict calls per concurrency level")
+    parser.add_argument("--repeats", type=int, default=100, help="record-count calls (fetches use repeats / 20)")
+    parser.add_argument("--fetch-rows", type=int, default=5000)
+    parser.add_argument("--training-mode", default="in_memory")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="a previous result file to compare against")
+    args = parser.parse_args()
+
+    report = {"environment": environment(args), "results": {}}
+    with scratch_workdir() as workdir:
+        csv_path = os.path.join(workdir, "bench.csv")
+        with Stopwatch() as sw:
+            generate_dataset(csv_path, args.rows, args.features, args.missing_rate)
+        report["environment"]["dataset"] = {"rows": args.rows, "features": args.features, "csv_mb": round(os.path.getsize(csv_path) / 2**20, 1)}
+        print(f"Generated {args.rows} x {args.features} dataset in {sw.elapsed:.1f}s", file=sys.stderr)
+        for transport in args.transports:
+            report["results"][transport] = asyncio.run(run_transport(transport, csv_path, args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Threshold search: the previous loop (sklearn f1_score at each of 181 grid thresholds) against the
+sort + cumsum curve in app/ml/thresholds.py. Checks that both pick the same threshold for models
+trained on the bundled backend/*.csv datasets, then times both on synthetic score vectors.
+
+    python -m benchmarks.bench_threshold_search --sizes 10000 100000 1000000
+"""
+
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+from sklearn.metrics import f1_score
+
+import app.main as service
+from app.ml.dataset_index import read_range
+from app.ml.predictor import table_to_matrix
+from app.ml.thresholds import DEFAULT_THRESHOLD_GRID, optimize_threshold
+
+from ._common import ML_SERVICE_DIR, Stopwatch, service_client, training_windows
+
+
+def legacy_threshold(y_true, y_proba) -> float:
+    best_f1, best_threshold = 0, 0.5
+    for thr in DEFAULT_THRESHOLD_GRID:
+        f1 = f1_score(y_true, (y_proba >= thr).astype(int), zero_division=0)
+        if f1 > best_f1:
+            best_f1, best_threshold = f1, thr
+    return float(best_threshold)
+
+
+def check_dataset(path: str) -> dict:
+    with service_client() as client:
+        with open(path, "rb") as f:
+            upload = client.post("/upload-dataset/", files={"file": (os.path.basename(path), f, "text/csv")})
+        if upload.status_code != 200:
+            return {"dataset": os.path.basename(path), "skipped": upload.json().get("detail")}
+        windows = training_windows(upload.json())
+        client.post("/train-model", json=windows).raise_for_status()
+
+        entry = service.model_registry.active
+        test = read_range(service.PROCESSED_DATA_PATH, windows["testStart"], windows["testEnd"])
+        y_true = np.array([label == "pass" for label in test.column("Response").to_pylist()], dtype=int)
+        y_proba = entry.engine.predict_matrix(table_to_matrix(test, entry.columns, entry.engine.missing))  # scored as /predict scores it
+        legacy = legacy_threshold(y_true, y_proba)
+        vectorized, _ = optimize_threshold(y_true, y_proba)
+        return {"dataset": os.path.basename(path), "test_rows": len(y_true), "legacy_threshold": legacy,
+                "vectorized_threshold": vectorized, "trained_threshold": entry.threshold,
+                "match": legacy == vectorized == entry.threshold}
+
+
+def time_search(n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    y_true = (rng.random(n) < 0.8).astype(int)
+    # scores rounded to 3 decimals so many rows share a score, like a small boosted model's output
+    y_proba = np.clip(0.35 * y_true + rng.normal(0.45, 0.2, n), 0, 1).round(3).astype(np.float32)
+    with Stopwatch() as legacy_sw:
+        legacy = legacy_threshold(y_true, y_proba)
+    with Stopwatch() as vectorized_sw:
+        vectorized, curve = optimize_threshold(y_true, y_proba)
+    return {"rows": n, "legacy_s": round(legacy_sw.elapsed, 4), "vectorized_s": round(vectorized_sw.elapsed, 4),
+            "speedup": round(legacy_sw.elapsed / vectorized_sw.elapsed, 1), "curve_points": len(curve["thresholds"]),
+            "match": legacy == vectorized}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    datasets = sorted(glob.glob(os.path.join(ML_SERVICE_DIR, "..", "*.csv")))
+    results = {"datasets": [check_dataset(path) for path in datasets], "timings": [time_search(n) for n in args.sizes]}
+    print(json.dumps(results, indent=2))
+    if not all(r.get("match", True) for r in results["datasets"] + results["timings"]):
+        raise SystemExit("threshold mismatch")
+
+
+if __name__ == "__main__":
+    main()
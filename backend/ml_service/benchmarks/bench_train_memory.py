@@ -0,0 +1,69 @@
+"""
+Peak RSS and wall time of training for each training mode: "in_memory" (pandas + SMOTE),
+"streaming" (QuantileDMatrix fed by Parquet batches) and "external_memory" (ExtMemQuantileDMatrix).
+The dataset is ingested once; every training run happens in a fresh subprocess so ru_maxrss
+reflects that run alone.
+
+    python -m benchmarks.bench_train_memory --rows 200000 500000 --features 50
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from ._common import ML_SERVICE_DIR, Stopwatch, scratch_workdir, write_synthetic_csv
+
+TRAIN = """
+import json, resource, sys
+from app.ml.model_trainer import train_model_on_range
+mode, model_dir, train_start, train_end, test_start, test_end = sys.argv[1:7]
+metrics = train_model_on_range(train_start, train_end, test_start, test_end, model_dir=model_dir, training_mode=mode)
+print(json.dumps({"peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  "f1_score": metrics["f1_score"], "roc_auc": metrics["roc_auc"]}))
+"""
+
+
+def train_in_subprocess(mode: str, model_dir: str, windows: list, workdir: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=ML_SERVICE_DIR)
+    with Stopwatch() as sw:
+        result = subprocess.run([sys.executable, "-c", TRAIN, mode, model_dir, *windows], cwd=workdir, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}"}
+    entry = json.loads(result.stdout.strip().splitlines()[-1])
+    return {"seconds": round(sw.elapsed, 1), "peak_rss_mb": round(entry["peak_rss_mb"], 1),
+            "f1_score": round(entry["f1_score"], 2), "roc_auc": round(entry["roc_auc"], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[200_000, 500_000])
+    parser.add_argument("--features", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", default=["in_memory", "streaming", "external_memory"])
+    args = parser.parse_args()
+
+    from app.ml.ingest import convert_csv_to_parquet
+
+    results = []
+    with scratch_workdir() as workdir:
+        os.makedirs("data", exist_ok=True)
+        for rows in args.rows:
+            write_synthetic_csv("upload.csv", rows, args.features, signal=1.5)
+            with open("upload.csv", "rb") as f:
+                stats = convert_csv_to_parquet(f, os.path.join("data", "processed_dataset.parquet"))
+            os.remove("upload.csv")
+            start = stats["date_range_start"]
+            train_end = start + pd.Timedelta(seconds=int(rows * 0.8) - 1)
+            windows = [start.isoformat(), train_end.isoformat(), (train_end + pd.Timedelta(seconds=1)).isoformat(), stats["date_range_end"].isoformat()]
+            for mode in args.modes:
+                entry = dict(rows=rows, features=args.features, mode=mode, **train_in_subprocess(mode, os.path.join("model", "registry", f"{mode}_{rows}"), windows, workdir))
+                print(json.dumps(entry))
+                results.append(entry)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
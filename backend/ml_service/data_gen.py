@@ -1,3 +1,5 @@
+import argparse
+
 import pandas as pd
 import numpy as np
 
@@ -6,55 +8,81 @@ import numpy as np
 # -----------------------
 num_samples = 1000
 start_time = pd.to_datetime("2023-01-01 00:00:00")
+CHUNK_ROWS = 50_000  # rows generated and appended to the CSV at a time
 
-# -----------------------
-# Generate synthetic features
-# -----------------------
-np.random.seed(42)
-
-data = {
-    "Sample_ID": range(1, num_samples + 1),
-    "Temperature": np.random.normal(75, 5, num_samples),  # Mean 75°C ± 5
-    "Pressure": np.random.normal(30, 3, num_samples),      # Mean 30 PSI ± 3
-    "Vibration": np.random.normal(0.5, 0.1, num_samples),  # Mean 0.5g ± 0.1
-    "Speed": np.random.normal(120, 10, num_samples),       # Mean 120 RPM ± 10
-    "Voltage": np.random.normal(220, 5, num_samples),      # Mean 220V ± 5
+# The named sensors: mean ± standard deviation
+SENSORS = {
+    "Temperature": (75, 5),    # Mean 75°C ± 5
+    "Pressure": (30, 3),       # Mean 30 PSI ± 3
+    "Vibration": (0.5, 0.1),   # Mean 0.5g ± 0.1
+    "Speed": (120, 10),        # Mean 120 RPM ± 10
+    "Voltage": (220, 5),       # Mean 220V ± 5
 }
 
-# -----------------------
-# Generate Response (Pass/Fail)
-# -----------------------
-# Fail occurs when sensor readings deviate too much
-response = []
-for i in range(num_samples):
-    fail_prob = 0.1  # base 10% chance
-    # Increase failure probability for extreme values
-    if data["Temperature"][i] > 82 or data["Temperature"][i] < 68:
-        fail_prob += 0.3
-    if data["Pressure"][i] > 36 or data["Pressure"][i] < 24:
-        fail_prob += 0.3
-    if data["Vibration"][i] > 0.7:
-        fail_prob += 0.2
-    if data["Speed"][i] > 135 or data["Speed"][i] < 105:
-        fail_prob += 0.2
-    
-    response.append(0 if np.random.rand() < fail_prob else 1)
-
-data["Response"] = response
 
-# -----------------------
-# Add synthetic timestamp
-# -----------------------
-timestamps = [start_time + pd.Timedelta(seconds=i) for i in range(num_samples)]
-data["synthetic_timestamp"] = timestamps
+def station_feature_names(count: int, stations_per_line: int = 13, features_per_station: int = 20):
+    """Bosch-line style names (L<line>_S<station>_F<feature>) for the columns beyond the named sensors."""
+    return [f"L{i // (stations_per_line * features_per_station)}_S{i // features_per_station}_F{i}" for i in range(count)]
 
-# -----------------------
-# Create DataFrame and Save CSV
-# -----------------------
-df = pd.DataFrame(data)
-df.to_csv("sample_dataset.csv", index=False)
 
-print("\nGenerated dataset saved as 'realistic_production_data.csv'")
-print(df.head(10))
-print("\nClass distribution:")
-print(df['Response'].value_counts())
+def generate_chunk(rng, first_id: int, rows: int, num_features: int, missing_rate: float) -> pd.DataFrame:
+    data = {"Sample_ID": np.arange(first_id, first_id + rows)}
+    named = list(SENSORS)[:num_features]
+    for name in named:
+        mean, std = SENSORS[name]
+        data[name] = rng.normal(mean, std, rows)
+
+    # -----------------------
+    # Generate Response (Pass/Fail)
+    # -----------------------
+    # Fail occurs when sensor readings deviate too much (base 10% chance)
+    fail_prob = np.full(rows, 0.1)
+    if "Temperature" in data: fail_prob += 0.3 * ((data["Temperature"] > 82) | (data["Temperature"] < 68))
+    if "Pressure" in data: fail_prob += 0.3 * ((data["Pressure"] > 36) | (data["Pressure"] < 24))
+    if "Vibration" in data: fail_prob += 0.2 * (data["Vibration"] > 0.7)
+    if "Speed" in data: fail_prob += 0.2 * ((data["Speed"] > 135) | (data["Speed"] < 105))
+
+    # Station measurements: small normalized readings, mostly missing on real lines
+    extra = num_features - len(named)
+    if extra > 0:
+        values = rng.normal(0, 0.1, (rows, extra)).round(3)
+        if missing_rate > 0:
+            values[rng.random((rows, extra)) < missing_rate] = np.nan
+        data.update(zip(station_feature_names(extra), values.T))
+
+    data["Response"] = np.where(rng.random(rows) < fail_prob, 0, 1)
+    data["synthetic_timestamp"] = start_time + pd.to_timedelta(data["Sample_ID"] - 1, unit="s")
+    return pd.DataFrame(data)
+
+
+def generate_dataset(path: str, num_samples: int = num_samples, num_features: int = len(SENSORS), missing_rate: float = 0.0,
+                     seed: int = 42, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """
+    Writes `num_samples` rows chunk by chunk, so the file size is not limited by memory. The first five features
+    are the named sensors that drive the failure rate; any further ones are station measurements, with
+    `missing_rate` of their values left empty. Returns the class distribution.
+    """
+    rng = np.random.default_rng(seed)
+    counts = {0: 0, 1: 0}
+    for start in range(0, num_samples, chunk_rows):
+        chunk = generate_chunk(rng, start + 1, min(chunk_rows, num_samples - start), num_features, missing_rate)
+        for label, count in chunk["Response"].value_counts().items(): counts[label] += int(count)
+        chunk.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates a synthetic production-line dataset.")
+    parser.add_argument("--rows", type=int, default=num_samples)
+    parser.add_argument("--features", type=int, default=len(SENSORS), help="5 named sensors; more adds Bosch-style station columns (e.g. 1000)")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="fraction of station values left empty")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="sample_dataset.csv")
+    args = parser.parse_args()
+
+    counts = generate_dataset(args.output, args.rows, args.features, args.missing_rate, args.seed)
+
+    print(f"\nGenerated dataset saved as '{args.output}'")
+    print(pd.read_csv(args.output, nrows=10).iloc[:, :8])
+    print("\nClass distribution:")
+    print(pd.Series(counts, name="count").rename_axis("Response"))